@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+'''
+Generate synthetic data in the format written by the LaTeX package, for
+benchmarking.
+'''
+
+
+from __future__ import annotations
+
+import random
+from typing import Any, NamedTuple
+
+
+
+
+class CorpusSettings(NamedTuple):
+    '''
+    Settings for a synthetic document.
+
+    `schema_mix` gives relative weights for the kinds of values:  `scalar`
+    (`int`, `float`, `bool`, `str`), `collection` (nested lists and dicts),
+    `verbatim` (schema type `verbatim`), and `evalany` (keys that are not in
+    the schema, with `schema_missing` set to `evalany`).  A fraction
+    `multiline` of string values are written in multiline form.
+    '''
+    records: int = 1000
+    keys: int = 10
+    keypath_depth: int = 1
+    value_size: int = 20
+    schema_mix: tuple[tuple[str, float], ...] = (('scalar', 1.0),)
+    multiline: float = 0.0
+    seed: int = 0
+
+
+# Named corpora used by the benchmarks
+profiles: dict[str, CorpusSettings] = {
+    'small': CorpusSettings(records=100),
+    'many_records': CorpusSettings(records=20000),
+    'wide': CorpusSettings(records=500, keys=200),
+    'deep_keypaths': CorpusSettings(records=5000, keypath_depth=6),
+    'large_values': CorpusSettings(records=500, value_size=20000, schema_mix=(('verbatim', 1.0),)),
+    'multiline': CorpusSettings(records=5000, value_size=200, schema_mix=(('verbatim', 1.0),), multiline=1.0),
+    'collections': CorpusSettings(records=5000, schema_mix=(('collection', 1.0),)),
+    'evalany': CorpusSettings(records=5000, schema_mix=(('evalany', 1.0),)),
+    'mixed': CorpusSettings(records=10000, schema_mix=(('scalar', 4.0), ('collection', 2.0),
+                                                       ('verbatim', 2.0), ('evalany', 1.0)),
+                            multiline=0.2),
+}
+
+
+scalar_types = ('int', 'float', 'bool', 'str')
+collection_types = ('list[int]', 'dict[str, list[float]]', 'set[str]')
+
+# Characters for string values.  LaTeX data often contains backslashes, and
+# values may contain quotation marks and non-ASCII text.
+text_alphabet = 'abcdefghijklmnopqrstuvwxyz    \\{}"αβγ'
+
+
+
+
+def _quote(value: str, multiline: bool) -> str:
+    # Quote a string the way the LaTeX package does
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    if multiline:
+        return f'"""\\\n{escaped}\n"""'
+    return '"' + escaped.replace('\n', '\\n') + '"'
+
+
+def _text(rng: random.Random, size: int) -> str:
+    return ''.join(rng.choices(text_alphabet, k=size))
+
+
+def _value_for(annot: str, rng: random.Random, size: int) -> str:
+    # Python literal source for a value of the given type
+    if annot == 'int':
+        return str(rng.randint(-10**6, 10**6))
+    if annot == 'float':
+        return repr(rng.uniform(-1e6, 1e6))
+    if annot == 'bool':
+        return rng.choice(('True', 'False'))
+    if annot == 'str':
+        return repr(_text(rng, size))
+    if annot == 'list[int]':
+        return repr([rng.randint(0, 1000) for _ in range(max(1, size // 4))])
+    if annot == 'dict[str, list[float]]':
+        return repr({f'k{n}': [rng.random() for _ in range(3)] for n in range(max(1, size // 20))})
+    if annot == 'set[str]':
+        return repr({_text(rng, size) for _ in range(3)})
+    if annot == 'evalany':
+        return repr(rng.choice([[rng.randint(0, 100) for _ in range(4)], {'a': rng.random()}, _text(rng, size)]))
+    raise ValueError(annot)
+
+
+def generate(settings: CorpusSettings) -> tuple[str, dict[str, str]]:
+    '''
+    Generate a document.  Return the document text (including metadata with
+    the schema) and the schema.
+    '''
+    rng = random.Random(settings.seed)
+    kinds = [kind for kind, _ in settings.schema_mix]
+    weights = [weight for _, weight in settings.schema_mix]
+    schema: dict[str, str] = {}
+    key_annots: list[tuple[str, str]] = []
+    for n in range(settings.keys):
+        key = '.'.join([f'key{n}'] + [f'sub{d}' for d in range(1, settings.keypath_depth)])
+        kind = rng.choices(kinds, weights)[0]
+        if kind == 'scalar':
+            annot = rng.choice(scalar_types)
+        elif kind == 'collection':
+            annot = rng.choice(collection_types)
+        elif kind in ('verbatim', 'evalany'):
+            annot = kind
+        else:
+            raise ValueError(f'Unknown schema mix kind "{kind}"')
+        if annot != 'evalany':
+            schema[key] = annot
+        key_annots.append((key, annot))
+
+    metadata: dict[str, Any] = {'schema': schema, 'schema_missing': 'evalany'}
+    parts = [f'# latex2pydata metadata: {metadata!r}\n', '[\n']
+    for _ in range(settings.records):
+        parts.append('{\n')
+        for key, annot in key_annots:
+            if annot == 'verbatim':
+                value = _text(rng, settings.value_size)
+            else:
+                value = _value_for(annot, rng, settings.value_size)
+            multiline = rng.random() < settings.multiline
+            if multiline and annot == 'verbatim':
+                # Split long verbatim text into lines
+                value = '\n'.join(value[n:n+80] for n in range(0, len(value), 80))
+            parts.append(f'"{key}": {_quote(value, multiline)},\n')
+        parts.append('},\n')
+    parts.append(']\n')
+    return (''.join(parts), schema)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+'''
+Benchmark loading synthetic data.  Run from the `python/` directory:
+
+    python benchmarks/run.py [--save <file>] [--compare <file>]
+
+Each benchmark is timed (best of `--repeat` runs), and then run once more
+under `tracemalloc` to measure peak memory.  Results may be saved as a
+baseline, and compared against a saved baseline.
+'''
+
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+benchmarks_dir = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(benchmarks_dir.parent))
+sys.path.insert(0, str(benchmarks_dir))
+
+import latex2pydata
+from corpus import generate, profiles
+
+
+
+
+def benchmark_cases(text: str, schema: dict[str, str], path: pathlib.Path) -> dict[str, Callable[[], Any]]:
+    '''
+    Benchmarks for a single document.  Only public APIs are used, so that
+    results remain comparable with saved baselines as internals change.
+    Schema conversion and validation cost is the difference between `loads`
+    and `loads_verbatim`.
+    '''
+    compiled_schema = latex2pydata.compile_schema(schema, 'evalany')
+
+    def iterloads():
+        for _ in latex2pydata.iterloads(text):
+            pass
+
+    return {
+        'loads': lambda: latex2pydata.loads(text),
+        'loads_verbatim': lambda: latex2pydata.loads(text, schema={}, schema_missing='verbatim'),
+        'loads_literal_eval': lambda: latex2pydata.loads(text, parser='literal_eval'),
+        'load': lambda: latex2pydata.load(path),
+        'iterloads': iterloads,
+        'validate': lambda: latex2pydata.validate(text, schema=compiled_schema),
+    }
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(profile_names: list[str], benchmark_names: list[str] | None, repeat: int,
+        scale: float, memory: bool) -> dict[str, Any]:
+    results: dict[str, dict[str, float | int]] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for profile_name in profile_names:
+            settings = profiles[profile_name]
+            settings = settings._replace(records=max(1, int(settings.records * scale)))
+            text, schema = generate(settings)
+            path = pathlib.Path(temp_dir) / f'{profile_name}.pydata'
+            path.write_text(text, encoding='utf8')
+            for name, func in benchmark_cases(text, schema, path).items():
+                if benchmark_names and name not in benchmark_names:
+                    continue
+                result: dict[str, float | int] = {'time': time_call(func, repeat)}
+                if memory:
+                    result['peak_memory'] = peak_memory(func)
+                case = f'{profile_name}/{name}'
+                results[case] = result
+                print(format_result(case, result), flush=True)
+    return {
+        'latex2pydata': latex2pydata.__version__,
+        'python': platform.python_version(),
+        'scale': scale,
+        'results': results,
+    }
+
+
+def format_result(case: str, result: dict[str, float | int]) -> str:
+    line = f'{case:<36} {result["time"]*1000:>10.2f} ms'
+    if 'peak_memory' in result:
+        line += f' {result["peak_memory"]/2**20:>10.2f} MiB'
+    return line
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    '''
+    Print a comparison report, and return the cases that are slower or use
+    more memory than the baseline by more than `threshold` (fraction).
+    '''
+    if baseline.get('scale') != current.get('scale'):
+        print(f'Warning:  baseline scale {baseline.get("scale")} differs from current scale {current["scale"]}')
+    regressions = []
+    print(f'\n{"case":<36} {"time":>10} {"memory":>10}')
+    for case, result in current['results'].items():
+        base_result = baseline['results'].get(case)
+        if base_result is None:
+            print(f'{case:<36} {"(new)":>10}')
+            continue
+        ratios = []
+        for metric in ('time', 'peak_memory'):
+            if metric in result and metric in base_result and base_result[metric]:
+                ratio = result[metric] / base_result[metric]
+                ratios.append(f'{ratio:>9.2f}x')
+                if ratio > 1 + threshold:
+                    regressions.append(f'{case} {metric}')
+            else:
+                ratios.append(f'{"-":>10}')
+        print(f'{case:<36} {" ".join(ratios)}')
+    if regressions:
+        print(f'\nRegressions (more than {threshold:.0%} worse than baseline):')
+        for regression in regressions:
+            print(f'  {regression}')
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark latex2pydata loading with synthetic data')
+    arg_parser.add_argument('--profile', action='append', choices=sorted(profiles),
+                            help='Corpus profile to run (may be repeated; default all)')
+    arg_parser.add_argument('--benchmark', action='append',
+                            help='Benchmark to run (may be repeated; default all)')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Timing runs per benchmark (best is kept)')
+    arg_parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for the number of records')
+    arg_parser.add_argument('--no-memory', action='store_true', help='Skip peak memory measurement')
+    arg_parser.add_argument('--save', type=pathlib.Path, help='Save results as JSON (baseline)')
+    arg_parser.add_argument('--compare', type=pathlib.Path, help='Compare results with saved baseline')
+    arg_parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Fractional slowdown or memory increase reported as a regression')
+    args = arg_parser.parse_args()
+
+    current = run(args.profile or list(profiles), args.benchmark, args.repeat, args.scale, not args.no_memory)
+    if args.save:
+        args.save.write_text(json.dumps(current, indent=2), encoding='utf8')
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding='utf8'))
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,4 +9,14 @@
 
 
 from .version import __version__, __version_info__
-from .loading import load, loads
+from .loading import load, loads, iterload, iterloads, write_sidecar
+from .schema import CompiledSchema, compile_schema
+from .lazy import LazyDict
+from .records import SlotsRecord
+from .columns import load_columns, loads_columns
+from .incremental import IncrementalLoader
+from .index import RecordIndex, build_index, load_record, load_records, open_index
+from .stats import LoadStats
+from .validation import ValidationResult, validate, validate_file
+from .parallel import LoadResult, load_many, validate_many
+from .aio import aload, aload_many
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+import sys
+from .cli import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())
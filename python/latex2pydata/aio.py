@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+import pathlib
+from typing import Any, AsyncIterator, Iterable
+from .loading import Parser, load
+from .parallel import LoadResult
+from .schema import CompiledSchema, SchemaMissing, compile_schema
+
+
+
+
+async def aload(path: str | os.PathLike,
+                encoding: str | None = None,
+                schema: dict[str, str] | CompiledSchema | None = None,
+                schema_missing: SchemaMissing | None = None,
+                parser: Parser = 'scan',
+                executor: concurrent.futures.Executor | None = None) -> dict[str, Any] | list[dict[str, Any]]:
+    '''
+    Load data from a file without blocking the event loop.  Reading and
+    parsing take place in `executor`, which may be a thread or process pool.
+    By default, the event loop's default executor (a thread pool) is used.
+    Since parsing is CPU bound, a process pool allows more parallelism.
+
+    If the awaiting task is cancelled before the file is processed, the file
+    is never loaded.  If loading has already started, it runs to completion
+    in the executor and the result is discarded.
+    '''
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor,
+        functools.partial(load, pathlib.Path(path), encoding=encoding, schema=schema,
+                          schema_missing=schema_missing, parser=parser)
+    )
+
+
+async def aload_many(paths: Iterable[str | os.PathLike],
+                     encoding: str | None = None,
+                     schema: dict[str, str] | CompiledSchema | None = None,
+                     schema_missing: SchemaMissing | None = None,
+                     parser: Parser = 'scan',
+                     executor: concurrent.futures.Executor | None = None,
+                     limit: int | None = None,
+                     ordered: bool = True) -> AsyncIterator[LoadResult]:
+    '''
+    Load multiple files with `aload()`, yielding a `LoadResult` for each
+    file.  At most `limit` files are loaded at once (default no limit beyond
+    that of the executor), so that a small limit leaves executor capacity
+    for other work.
+
+    Results are yielded in the same order as `paths` by default, or as they
+    are completed with `ordered=False`.  An error in one file is reported in
+    its `LoadResult` and does not prevent other files from being loaded.  If
+    iteration stops early or is cancelled, loading files that have not yet
+    started is cancelled.
+    '''
+    paths = [pathlib.Path(path) for path in paths]
+    if limit is not None and limit < 1:
+        raise ValueError('"limit" must be a positive integer')
+    if schema is not None and not isinstance(schema, CompiledSchema):
+        schema = compile_schema(schema)
+    semaphore = asyncio.Semaphore(limit) if limit is not None else None
+
+    async def load_path(path: pathlib.Path) -> LoadResult:
+        try:
+            if semaphore is None:
+                data = await aload(path, encoding, schema, schema_missing, parser, executor)
+            else:
+                async with semaphore:
+                    data = await aload(path, encoding, schema, schema_missing, parser, executor)
+        except Exception as e:
+            return LoadResult(path, None, e)
+        return LoadResult(path, data, None)
+
+    tasks = [asyncio.ensure_future(load_path(path)) for path in paths]
+    try:
+        if ordered:
+            for task in tasks:
+                yield await task
+        else:
+            for next_completed in asyncio.as_completed(tasks):
+                yield await next_completed
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+import pickle
+import tempfile
+import threading
+from typing import Any
+from .version import __version__
+
+
+
+
+default_cache_max_size = 2**28
+
+cache_file_suffix = '.pickle'
+
+# Estimated total size of entries in each cache directory:  the size found by
+# the last scan of the directory, plus the size of entries written by this
+# process since then, which is tracked separately.  The directory is only
+# scanned again when the estimate exceeds the maximum size, or when this
+# process has written more than `rescan_fraction` of the maximum size since
+# the last scan (to account for entries written by other processes).
+# Eviction removes an extra `rescan_fraction` of the maximum size, so that a
+# full cache is not scanned again for every new entry.
+_size_estimates: dict[str, tuple[int, int]] = {}
+_size_estimates_lock = threading.Lock()
+rescan_fraction = 1/8
+
+
+
+
+class ParseCache(object):
+    '''
+    On-disk cache of loaded data.  Entries are stored in pickle format, so a
+    cache directory must only be shared with trusted processes.
+
+    Entries are written to a temporary file and then moved into place, so
+    concurrent writers never produce a partial entry.  Reading an entry
+    updates its modification time, and when the total size of all entries
+    exceeds `max_size` bytes, the least recently used entries are removed.
+    The total size is tracked as entries are written, so the directory is
+    only scanned occasionally.  Entries written by other processes are only
+    counted at the next scan, so the limit may be exceeded temporarily.
+    '''
+    def __init__(self, cache_dir: str | os.PathLike, max_size: int = default_cache_max_size):
+        self.cache_dir: pathlib.Path = pathlib.Path(cache_dir)
+        self.max_size: int = max_size
+
+    @staticmethod
+    def key(content: bytes, *settings: Any) -> str:
+        '''
+        Create a cache key from data content, plus all settings that affect
+        how the content is loaded.  The library version is always included.
+        '''
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(repr((__version__, settings)).encode('utf8'))
+        hasher.update(b'\0')
+        hasher.update(content)
+        return hasher.hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / f'{key}{cache_file_suffix}'
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        '''
+        Return `(True, <data>)` for a cache hit, or `(False, None)` for a
+        miss.
+        '''
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except OSError:
+            return (False, None)
+        except Exception:
+            # Corrupt or incompatible entry
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return (False, None)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return (True, data)
+
+    def set(self, key: str, data: Any):
+        '''
+        Store data in the cache, then remove old entries if the cache may
+        have grown too large.
+        '''
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            os.replace(temp_name, self._path(key))
+        except BaseException:
+            try:
+                os.unlink(temp_name)
+            except OSError:
+                pass
+            raise
+        estimate_key = os.path.abspath(self.cache_dir)
+        with _size_estimates_lock:
+            scanned_size, written_size = _size_estimates.get(estimate_key, (None, 0))
+            if scanned_size is not None:
+                written_size += size
+                _size_estimates[estimate_key] = (scanned_size, written_size)
+        if (scanned_size is None or scanned_size + written_size > self.max_size or
+                written_size > self.max_size * rescan_fraction):
+            self.evict()
+
+    def evict(self):
+        '''
+        If the total size of all entries is more than `max_size`, remove
+        least recently used entries until it is no more than
+        `(1 - rescan_fraction)*max_size`.  This always scans the cache
+        directory.
+        '''
+        entries = []
+        total_size = 0
+        try:
+            with os.scandir(self.cache_dir) as dir_entries:
+                for dir_entry in dir_entries:
+                    if not dir_entry.name.endswith(cache_file_suffix):
+                        continue
+                    try:
+                        stat = dir_entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                    total_size += stat.st_size
+        except OSError:
+            return
+        if total_size > self.max_size:
+            target_size = self.max_size - int(self.max_size * rescan_fraction)
+            entries.sort()
+            for _, size, path in entries:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    # Already removed by another process, or in use
+                    pass
+                total_size -= size
+                if total_size <= target_size:
+                    break
+        with _size_estimates_lock:
+            _size_estimates[os.path.abspath(self.cache_dir)] = (total_size, 0)
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+'''
+Command-line interface:
+
+    python -m latex2pydata validate <paths>
+    python -m latex2pydata convert --to jsonl|sidecar <paths>
+    python -m latex2pydata stats <paths>
+
+Paths may be files, directories (searched recursively for files matching
+`--pattern`), or glob patterns.  Files are processed in parallel with a pool
+of worker processes, and results are written as each file is finished.  The
+exit status is 1 if any file could not be processed.
+'''
+
+
+from __future__ import annotations
+
+import argparse
+import collections
+import concurrent.futures
+import functools
+import glob
+import itertools
+import json
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, get_args
+from .loading import Parser, iterload, load, write_sidecar
+from .schema import SchemaMissing, compile_schema
+from .stats import LoadStats
+from .validation import validate_file
+from .version import __version__
+
+
+
+
+default_pattern = '*.pydata'
+glob_chars = set('*?[')
+
+
+
+
+class InputPath(NamedTuple):
+    '''
+    A file to process, and the directory that output paths are relative to
+    when output is written to a separate directory.
+    '''
+    path: pathlib.Path
+    base: pathlib.Path
+
+
+class FileResult(NamedTuple):
+    '''
+    Result of processing a single file in a worker.  If processing failed,
+    `errors` contains a description of each error.
+    '''
+    path: pathlib.Path
+    errors: list[str]
+    records: int = 0
+    output: Any = None
+
+
+
+
+def expand_paths(args: Iterable[str], pattern: str = default_pattern) -> list[InputPath]:
+    '''
+    Expand command-line paths:  directories are searched recursively for
+    files matching `pattern`, and arguments containing glob characters are
+    expanded with `glob`.  Other arguments are used as-is, so that a missing
+    file is reported as an error for that file.  Duplicates are removed.
+    '''
+    input_paths: list[InputPath] = []
+    seen: set[pathlib.Path] = set()
+    for arg in args:
+        path = pathlib.Path(arg)
+        if path.is_dir():
+            matches = [InputPath(p, path) for p in sorted(path.rglob(pattern)) if p.is_file()]
+        elif glob_chars.intersection(arg):
+            matches = [InputPath(p, p.parent) for p in map(pathlib.Path, sorted(glob.glob(arg, recursive=True)))
+                       if p.is_file()]
+        else:
+            matches = [InputPath(path, path.parent)]
+        for input_path in matches:
+            if input_path.path not in seen:
+                seen.add(input_path.path)
+                input_paths.append(input_path)
+    return input_paths
+
+
+def _describe_error(e: Exception) -> str:
+    description = f'{e.__class__.__name__}: {e}'
+    record = getattr(e, 'record', None)
+    if record is not None:
+        description = f'record {record}, key "{e.key}": {description}'
+    return description
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, (set, frozenset)):
+        try:
+            return sorted(obj)
+        except TypeError:
+            return list(obj)
+    raise TypeError(f'Value of type "{obj.__class__.__name__}" cannot be converted to JSON')
+
+
+
+
+# Settings for worker processes, set once per process by the pool initializer.
+# Serial runs pass `settings` to tasks explicitly instead.
+_worker_settings: dict[str, Any] = {}
+
+def _init_worker(settings: dict[str, Any]):
+    _worker_settings.clear()
+    _worker_settings.update(settings)
+
+
+def _load_kwargs(settings: dict[str, Any]) -> dict[str, Any]:
+    return {k: settings[k] for k in ('encoding', 'schema', 'schema_missing', 'parser')}
+
+
+def _validate_task(input_path: InputPath, settings: dict[str, Any] | None = None) -> FileResult:
+    if settings is None:
+        settings = _worker_settings
+    path = input_path.path
+    try:
+        result = validate_file(path, max_errors=settings['max_errors'], **_load_kwargs(settings))
+    except Exception as e:
+        return FileResult(path, [_describe_error(e)])
+    errors = [_describe_error(e) for e in result.errors]
+    if result.truncated:
+        errors.append(f'stopped after {len(result.errors)} errors')
+    return FileResult(path, errors, result.records)
+
+
+def _convert_task(input_path: InputPath, settings: dict[str, Any] | None = None) -> FileResult:
+    if settings is None:
+        settings = _worker_settings
+    path = input_path.path
+    to = settings['to']
+    if to == 'sidecar':
+        try:
+            output_path = write_sidecar(path, **_load_kwargs(settings))
+        except Exception as e:
+            return FileResult(path, [_describe_error(e)])
+        return FileResult(path, [], output=output_path)
+    output_dir = settings['output_dir']
+    records = 0
+    output_path: pathlib.Path | None = None
+    try:
+        if output_dir == '-':
+            # Output is written to a temporary file, which the main process
+            # copies to stdout.  Records are not kept in memory, and output
+            # from a file that fails is never mixed into stdout.
+            f = tempfile.NamedTemporaryFile('w', encoding='utf8', newline='\n', suffix='.jsonl', delete=False)
+            output_path = pathlib.Path(f.name)
+        else:
+            if output_dir is None:
+                output_path = path.with_suffix('.jsonl')
+            else:
+                output_path = pathlib.Path(output_dir) / path.relative_to(input_path.base).with_suffix('.jsonl')
+            if output_path.resolve() == path.resolve():
+                return FileResult(path, [f'Output path "{output_path}" is the same as the data file'])
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(output_path, 'w', encoding='utf8', newline='\n')
+        with f:
+            for record in iterload(path, **_load_kwargs(settings)):
+                f.write(json.dumps(record, ensure_ascii=False, default=_json_default))
+                f.write('\n')
+                records += 1
+    except Exception as e:
+        # Don't leave partial output that could be mistaken for a complete
+        # conversion
+        if output_path is not None:
+            try:
+                output_path.unlink()
+            except OSError:
+                pass
+        return FileResult(path, [_describe_error(e)])
+    return FileResult(path, [], records, output_path)
+
+
+def _stats_task(input_path: InputPath, settings: dict[str, Any] | None = None) -> FileResult:
+    if settings is None:
+        settings = _worker_settings
+    path = input_path.path
+    stats = LoadStats()
+    try:
+        load(path, stats=stats, **_load_kwargs(settings))
+    except Exception as e:
+        return FileResult(path, [_describe_error(e)])
+    return FileResult(path, [], stats.records, stats)
+
+
+def map_paths(task: Callable[..., FileResult], input_paths: list[InputPath], settings: dict[str, Any],
+              workers: int | None = None) -> Iterator[FileResult]:
+    '''
+    Run `task` for each path in a pool of `workers` processes (default
+    `os.cpu_count()`), yielding results in order.  Only a few tasks per
+    worker are submitted ahead of the result being yielded, so that
+    finished results are not accumulated when output is slower than
+    processing.
+    '''
+    if workers == 1:
+        serial_task = functools.partial(task, settings=settings)
+        for input_path in input_paths:
+            yield serial_task(input_path)
+        return
+    window = 4 * (workers or os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(settings,)) as executor:
+        path_iter = iter(input_paths)
+        pending = collections.deque(executor.submit(task, p) for p in itertools.islice(path_iter, window))
+        try:
+            while pending:
+                result = pending.popleft().result()
+                for input_path in itertools.islice(path_iter, 1):
+                    pending.append(executor.submit(task, input_path))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+
+
+def _copy_to_stdout(path: pathlib.Path):
+    try:
+        with open(path, encoding='utf8', newline='') as f:
+            shutil.copyfileobj(f, sys.stdout)
+        sys.stdout.flush()
+    finally:
+        path.unlink()
+
+
+def _stats_line(result: FileResult) -> str:
+    stats: LoadStats = result.output
+    phase_times = stats.phase_times
+    phases = ', '.join(f'{phase} {phase_times[phase]*1000:.1f} ms'
+                       for phase in ('read', 'parse', 'decode') if phase in phase_times)
+    return (f'{result.path}: {stats.records} records, {stats.bytes} bytes, '
+            f'{phase_times.get("total", 0.0)*1000:.1f} ms ({phases})')
+
+
+def run(args: argparse.Namespace) -> int:
+    input_paths = expand_paths(args.paths, args.pattern)
+    if not input_paths:
+        print('No input files', file=sys.stderr)
+        return 2
+    schema = None
+    if args.schema is not None:
+        try:
+            with open(args.schema, encoding='utf8') as f:
+                schema = compile_schema(json.load(f))
+        except Exception as e:
+            print(f'{args.schema}: {_describe_error(e)}', file=sys.stderr)
+            return 2
+    settings: dict[str, Any] = {
+        'encoding': args.encoding,
+        'schema': schema,
+        'schema_missing': args.schema_missing,
+        'parser': args.parser,
+    }
+    if args.command == 'validate':
+        task = _validate_task
+        settings.update(max_errors=args.max_errors)
+    elif args.command == 'convert':
+        task = _convert_task
+        settings.update(to=args.to, output_dir=args.output_dir)
+    elif args.command == 'stats':
+        task = _stats_task
+    else:
+        raise ValueError(args.command)
+
+    failures = 0
+    total_records = 0
+    total_stats = LoadStats()
+    for result in map_paths(task, input_paths, settings, args.workers):
+        if result.errors:
+            failures += 1
+            for error in result.errors:
+                print(f'{result.path}: error: {error}', file=sys.stderr, flush=True)
+            continue
+        total_records += result.records
+        if args.command == 'convert' and args.output_dir == '-':
+            _copy_to_stdout(result.output)
+        elif args.command == 'stats':
+            total_stats.update(result.output)
+            if args.json:
+                print(json.dumps({'path': str(result.path), **result.output.as_dict()}), flush=True)
+            elif not args.quiet:
+                print(_stats_line(result), flush=True)
+        elif not args.quiet:
+            if args.command == 'convert':
+                print(f'{result.path}: wrote {result.output}', flush=True)
+            else:
+                print(f'{result.path}: ok ({result.records} records)', flush=True)
+
+    if args.command == 'stats' and not args.json:
+        print(f'\nTotal ({len(input_paths) - failures} files):')
+        print(total_stats.report())
+    elif not args.quiet:
+        print(f'{len(input_paths)} files, {total_records} records, {failures} failed', file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument('paths', nargs='+', metavar='PATH',
+                               help='Data file, directory (searched recursively), or glob pattern')
+    common_parser.add_argument('--pattern', default=default_pattern,
+                               help=f'Glob pattern for files in directories (default "{default_pattern}")')
+    common_parser.add_argument('--encoding', help='Encoding of data files (default UTF-8)')
+    common_parser.add_argument('--schema', help='JSON file with a schema')
+    common_parser.add_argument('--schema-missing', choices=get_args(SchemaMissing),
+                               help='How to handle keys that are not in the schema')
+    common_parser.add_argument('--parser', choices=get_args(Parser), default='scan', help='Parser for raw data')
+    common_parser.add_argument('--workers', type=_positive_int,
+                               help='Number of worker processes (default number of CPUs)')
+    common_parser.add_argument('-q', '--quiet', action='store_true',
+                               help='Only report errors (and requested output)')
+
+    arg_parser = argparse.ArgumentParser(prog='python -m latex2pydata',
+                                         description='Validate, convert, and profile latex2pydata data files')
+    arg_parser.add_argument('--version', action='version', version=f'latex2pydata {__version__}')
+    subparsers = arg_parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+    validate_parser = subparsers.add_parser('validate', parents=[common_parser],
+                                            help='Check that data files load without errors')
+    validate_parser.add_argument('--max-errors', type=_positive_int,
+                                 help='Maximum number of errors reported for each file (default all)')
+    convert_parser = subparsers.add_parser('convert', parents=[common_parser],
+                                           help='Convert data files to JSON Lines or sidecar files')
+    convert_parser.add_argument('--to', choices=('jsonl', 'sidecar'), default='jsonl',
+                                help='Output format (default jsonl)')
+    convert_parser.add_argument('-o', '--output-dir',
+                                help='Directory for JSON Lines files, or "-" for stdout '
+                                     '(default next to each data file)')
+    stats_parser = subparsers.add_parser('stats', parents=[common_parser],
+                                         help='Report timing and counters for loading data files')
+    stats_parser.add_argument('--json', action='store_true', help='Write statistics for each file as JSON Lines')
+    args = arg_parser.parse_args(argv)
+    if args.command == 'convert' and args.to == 'sidecar' and args.output_dir is not None:
+        arg_parser.error('"--output-dir" is not supported with "--to sidecar"')
+    return run(args)
+
+
+def _positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError('must be a positive integer')
+    return n
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import array
+import functools
+import io
+import mmap
+import pathlib
+from typing import Any, Literal
+from .loading import Parser, _iter_raw_data_dicts, _load_leading_metadata, _load_readable, _process_schema
+from .scanning import RecordScanner
+from .schema import CompiledSchema, Decoder, SchemaMissing
+
+
+
+
+ColumnType = Literal['list', 'array', 'numpy']
+
+# `array.array` type codes for schema types that can be stored in typed
+# columns
+array_typecodes: dict[str, str] = {
+    'int': 'q',
+    'float': 'd',
+}
+
+
+
+
+def load_columns(readable: pathlib.Path | io.BytesIO | io.TextIOBase,
+                 encoding: str | None = None,
+                 schema: dict[str, str] | CompiledSchema | None = None,
+                 schema_missing: SchemaMissing | None = None,
+                 parser: Parser = 'scan',
+                 missing: Any = None,
+                 column_type: ColumnType = 'list') -> dict[str, Any]:
+    '''
+    Load data from a file in columnar form.  See `loads_columns()`.
+    '''
+    return _load_readable(readable, encoding,
+                          functools.partial(loads_columns, schema=schema, schema_missing=schema_missing,
+                                            parser=parser, missing=missing, column_type=column_type))
+
+
+def loads_columns(string: str | bytes | bytearray | memoryview | mmap.mmap,
+                  schema: dict[str, str] | CompiledSchema | None = None,
+                  schema_missing: SchemaMissing | None = None,
+                  parser: Parser = 'scan',
+                  missing: Any = None,
+                  column_type: ColumnType = 'list') -> dict[str, Any]:
+    '''
+    Load data from a string in columnar form:  a dict that maps each key
+    (key path) to a column containing the values for that key from each
+    top-level dict in the data.  Single-dict data gives columns of length 1.
+
+    Columns are in the order that keys first appear in the data, followed by
+    columns for any schema keys that do not appear at all.  When a dict lacks
+    a key, its place in the column is filled with `missing`.
+
+    Columns are lists by default.  With `column_type='array'`, columns with
+    schema type `int` or `float` are `array.array` with type code `q` or
+    `d`, and with `column_type='numpy'`, they are NumPy arrays (this
+    requires NumPy).  If such a column contains a value that does not fit,
+    such as a `missing` value of `None` or a `bool` in an `int` column, then
+    it remains a list.
+    '''
+    if column_type not in ('list', 'array', 'numpy'):
+        raise ValueError(f'Invalid column_type "{column_type}"')
+    if column_type == 'numpy':
+        import numpy
+
+    metadata, pos = _load_leading_metadata(string)
+    schema = _process_schema(metadata, schema, schema_missing)
+
+    builder = ColumnBuilder(schema, missing, typed=column_type != 'list')
+    scanner = RecordScanner(string, pos=pos)
+    for raw_data_dict in _iter_raw_data_dicts(scanner, parser):
+        builder.append(raw_data_dict)
+    columns = builder.finish()
+
+    if column_type == 'numpy':
+        for key, column in columns.items():
+            if isinstance(column, array.array):
+                columns[key] = numpy.frombuffer(column, dtype=column.typecode)
+    return columns
+
+
+
+
+class ColumnBuilder(object):
+    '''
+    Decode raw dicts directly into columns, without creating a dict for each
+    record.
+    '''
+    def __init__(self, schema: CompiledSchema, missing: Any = None, typed: bool = False):
+        self.schema: CompiledSchema = schema
+        self.missing: Any = missing
+        self.typed: bool = typed
+        self.length: int = 0
+        self.columns: dict[str, list[Any] | array.array] = {}
+        self._decoders: dict[str, Decoder] = {}
+
+    def _add_column(self, key: str):
+        self._decoders[key] = self.schema.get_decoder(key)
+        column: list[Any] | array.array
+        typecode = array_typecodes.get(self.schema.entries[key].annot) if key in self.schema.entries else None
+        if self.typed and typecode is not None:
+            column = array.array(typecode)
+        else:
+            column = []
+        self.columns[key] = column
+        if self.length:
+            self._fill(key, self.length)
+
+    def _append(self, key: str, value: Any):
+        column = self.columns[key]
+        if value.__class__ is not bool or column.__class__ is list:
+            try:
+                column.append(value)
+                return
+            except (TypeError, OverflowError):
+                pass
+        # Value does not fit in a typed column.  A `bool` passes the `int`
+        # annotation, but would be stored as 1 or 0.
+        column = list(column)
+        column.append(value)
+        self.columns[key] = column
+
+    def _fill(self, key: str, count: int):
+        for _ in range(count):
+            self._append(key, self.missing)
+
+    def append(self, raw_data_dict: dict[str, str]):
+        '''
+        Decode a raw dict and append its values to the columns.
+        '''
+        decoders = self._decoders
+        for raw_k, raw_v in raw_data_dict.items():
+            try:
+                decode = decoders[raw_k]
+            except KeyError:
+                self._add_column(raw_k)
+                decode = decoders[raw_k]
+            self._append(raw_k, decode(raw_k, raw_v))
+        self.length += 1
+        if len(raw_data_dict) < len(self.columns):
+            for key, column in self.columns.items():
+                if len(column) < self.length:
+                    self._append(key, self.missing)
+
+    def finish(self) -> dict[str, list[Any] | array.array]:
+        '''
+        Add columns for any schema keys that were not in the data, and return
+        all columns.
+        '''
+        for key in self.schema.entries:
+            if key not in self.columns:
+                self._add_column(key)
+        return self.columns
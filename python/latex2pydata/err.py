@@ -8,8 +8,16 @@
 #
 
 
+from __future__ import annotations
+
+
+
+
 class Latex2PydataError(Exception):
-    pass
+    # Location of the error in data, set for errors collected by `validate()`.
+    # `record` is the index of the dict (0 for data that is a single dict).
+    record: int | None = None
+    key: str | None = None
 
 class Latex2PydataInvalidMetadataError(Latex2PydataError):
     pass
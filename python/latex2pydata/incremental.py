@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import codecs
+import hashlib
+import io
+import os
+import pathlib
+from typing import Any, Callable
+from .err import Latex2PydataInvalidDataError
+from .loading import _DecodeOptions, _load_leading_metadata, _process_schema, _record_decoder
+from .scanning import IncompleteDataError, bytes_syntax, raw_data_type_error_message
+from .schema import CompiledSchema, SchemaMissing
+
+
+
+
+# Size of reads when hashing previously consumed data to detect whether a
+# file has been rewritten
+prefix_read_size = 2**20
+
+
+def _skip_whitespace(data: bytes, pos: int) -> int:
+    # A backslash at the end of the data may begin a line continuation that
+    # has not been written yet, so it is treated as the end of the data
+    pos = bytes_syntax.whitespace_or_comment_re.match(data, pos).end()
+    if bytes_syntax.ends_with_line_continuation(data, pos):
+        return len(data)
+    return pos
+
+
+
+
+class IncrementalLoader(object):
+    '''
+    Load a UTF-8 data file that is still being written, such as a file that
+    LaTeX is appending to.  Each call to `refresh()` parses and decodes only
+    the top-level dicts that have been completed since the last call.  The
+    loader keeps track of the byte offset after the last complete dict, so
+    parsing and decoding are proportional to the new data rather than to the
+    whole file.
+
+    If the file has been rewritten rather than appended to, all data is
+    loaded again.  This is detected by comparing the file identity and a
+    hash of all previously consumed data.  The hash is extended as data is
+    consumed, and checking it only requires reading the file, which is much
+    faster than parsing it again.
+    '''
+    def __init__(self, path: str | os.PathLike,
+                 schema: dict[str, str] | CompiledSchema | None = None,
+                 schema_missing: SchemaMissing | None = None):
+        self.path: pathlib.Path = pathlib.Path(path)
+        self._schema: dict[str, str] | CompiledSchema | None = schema
+        self._schema_missing: SchemaMissing | None = schema_missing
+        self.reset()
+
+    def reset(self):
+        '''
+        Discard all loaded data, so that the next refresh loads the whole
+        file.
+        '''
+        self.records: list[dict[str, Any]] = []
+        self.top_is_list: bool | None = None
+        self.complete: bool = False
+        self.offset: int = 0
+        self._need_comma: bool = False
+        self._decode_record: Callable[[dict[str, str]], Any] | None = None
+        self._file_id: tuple[int, int] | None = None
+        # Hash of the data before `offset`, which is `None` until the header
+        # (metadata and opening `[` or `{`) has been consumed
+        self._prefix_hasher: Any = None
+
+    @property
+    def data(self) -> dict[str, Any] | list[dict[str, Any]] | None:
+        '''
+        All data loaded so far:  a list of dicts, or a dict if the data is a
+        single dict.  `None` if the type of data is not yet known.
+        '''
+        if self.top_is_list is None:
+            return None
+        if self.top_is_list:
+            return self.records
+        return self.records[0] if self.records else None
+
+    def _prefix_unchanged(self, f: io.BufferedReader, stat: os.stat_result) -> bool:
+        # Leaves `f` positioned at `offset` if the data is unchanged
+        if (stat.st_dev, stat.st_ino) != self._file_id or stat.st_size < self.offset:
+            return False
+        f.seek(0)
+        hasher = hashlib.blake2b(digest_size=16)
+        remaining = self.offset
+        while remaining:
+            chunk = f.read(min(remaining, prefix_read_size))
+            if not chunk:
+                return False
+            hasher.update(chunk)
+            remaining -= len(chunk)
+        return hasher.digest() == self._prefix_hasher.digest()
+
+    def refresh(self) -> list[dict[str, Any]]:
+        '''
+        Load any dicts that have been completed since the last refresh, and
+        return them.  They are also appended to `records`.  If the file has
+        been rewritten, all data is loaded again, and all dicts are returned.
+        '''
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if self._prefix_hasher is not None and not self._prefix_unchanged(f, stat):
+                self.reset()
+            new_records: list[dict[str, Any]] = []
+            if self._prefix_hasher is None:
+                f.seek(0)
+                data = f.read()
+                if not self._scan_header(data, stat):
+                    return new_records
+                base = 0
+            else:
+                data = f.read()
+                base = self.offset
+            start = self.offset
+            try:
+                if self.complete:
+                    self._check_end(data, 0)
+                else:
+                    self._scan_records(data, start - base, base, new_records)
+            finally:
+                self._prefix_hasher.update(data[start-base:self.offset-base])
+        return new_records
+
+    def _scan_header(self, data: bytes, stat: os.stat_result) -> bool:
+        # Process metadata and the opening `[` or `{`.  Return `False` if the
+        # header is not yet complete.
+        if b'\n' not in data and data[:len(codecs.BOM_UTF8)+1].lstrip(codecs.BOM_UTF8)[:1] == b'#':
+            # Metadata or comment line may be incomplete
+            return False
+        metadata, pos = _load_leading_metadata(data)
+        pos = _skip_whitespace(data, pos)
+        char = data[pos:pos+1]
+        if not char:
+            return False
+        if char == bytes_syntax.open_list:
+            self.top_is_list = True
+            pos += 1
+        elif char == bytes_syntax.open_dict:
+            self.top_is_list = False
+        else:
+            raise Latex2PydataInvalidDataError(raw_data_type_error_message)
+        schema = _process_schema(metadata, self._schema, self._schema_missing)
+        self._decode_record = _record_decoder(schema, _DecodeOptions())
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self._prefix_hasher = hashlib.blake2b(data[:pos], digest_size=16)
+        self.offset = pos
+        return True
+
+    def _check_end(self, data: bytes, pos: int):
+        # Once the data is complete, anything after it other than whitespace
+        # and comments is invalid
+        pos = _skip_whitespace(data, pos)
+        if pos < len(data):
+            expected = 'list' if self.top_is_list else 'dict'
+            raise Latex2PydataInvalidDataError(
+                f'Loading data failed:\nexpected end of data after {expected}, '
+                f'but found "{bytes_syntax.excerpt(data, pos)}"'
+            )
+
+    def _scan_records(self, data: bytes, pos: int, base: int, new_records: list[dict[str, Any]]):
+        # Scan `data`, which begins at file offset `base`, for complete
+        # records.  `self.offset` is updated after each record, so that an
+        # invalid record leaves the loader in a consistent state.
+        syntax = bytes_syntax
+        while True:
+            pos = _skip_whitespace(data, pos)
+            char = data[pos:pos+1]
+            if not char:
+                return
+            if self.top_is_list:
+                if self._need_comma and char != syntax.close_list:
+                    if char != syntax.comma:
+                        raise Latex2PydataInvalidDataError(
+                            f'Loading data failed:\nexpected "," or "]", but found "{syntax.excerpt(data, pos)}"'
+                        )
+                    pos = _skip_whitespace(data, pos + 1)
+                    char = data[pos:pos+1]
+                    if not char:
+                        return
+                if char == syntax.close_list:
+                    self.complete = True
+                    self.offset = base + pos + 1
+                    self._check_end(data, pos + 1)
+                    return
+                if char != syntax.open_dict:
+                    raise Latex2PydataInvalidDataError(raw_data_type_error_message)
+            try:
+                raw_data_dict, pos = syntax.parse_raw_data_dict(data, pos)
+            except IncompleteDataError:
+                return
+            record = self._decode_record(raw_data_dict)
+            self.records.append(record)
+            new_records.append(record)
+            self.offset = base + pos
+            self._need_comma = True
+            if not self.top_is_list:
+                self.complete = True
+                self._check_end(data, pos)
+                return
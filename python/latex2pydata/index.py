@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import array
+import json
+import mmap
+import os
+import pathlib
+import struct
+import sys
+from typing import Any, BinaryIO, Iterable
+from .err import Latex2PydataInvalidDataError
+from .loading import _DecodeOptions, _load_leading_metadata, _process_schema, _record_decoder
+from .scanning import IncompleteDataError, RecordScanner, bytes_syntax
+from .schema import CompiledSchema, SchemaMissing
+from .sidecar import atomic_write, content_hash, source_hash
+
+
+
+
+# Index file layout:
+#
+#   * `index_magic`
+#   * Header length (little-endian uint32)
+#   * Header (JSON):  format version, size, mtime, and hash of the data file,
+#     and the number of records
+#   * Record offsets:  `(<start>, <end>)` byte offsets for each record, as
+#     little-endian uint64
+index_magic = b'L2PYDIDX'
+index_format_version = 1
+index_suffix = '.idx'
+_header_length_struct = struct.Struct('<I')
+
+
+
+
+def index_path(path: str | os.PathLike) -> pathlib.Path:
+    '''
+    Path of the record index for a data file:  `<name>.idx` in the same
+    directory.
+    '''
+    path = pathlib.Path(path)
+    return path.with_name(path.name + index_suffix)
+
+
+def _map_file(f: BinaryIO) -> mmap.mmap | bytes:
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files cannot be mapped
+        return b''
+
+
+
+
+class RecordIndex(object):
+    '''
+    Byte offsets of the top-level dicts in a UTF-8 data file, plus the size,
+    modification time, and hash of the file when the index was built.
+    '''
+    __slots__ = ('path', 'size', 'mtime_ns', 'source_hash', 'offsets')
+
+    def __init__(self, path: pathlib.Path, size: int, mtime_ns: int, source_hash: str, offsets: array.array):
+        self.path: pathlib.Path = path
+        self.size: int = size
+        self.mtime_ns: int = mtime_ns
+        self.source_hash: str = source_hash
+        # Flat sequence of `<start>, <end>` for each record
+        self.offsets: array.array = offsets
+
+    def __len__(self):
+        return len(self.offsets) // 2
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {str(self.path)!r} records={len(self)}>'
+
+    def span(self, index: int) -> tuple[int, int]:
+        '''
+        Byte offsets `(<start>, <end>)` of a record.  Negative indices count
+        from the end, as for lists.
+        '''
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(f'Record index {index} out of range for {length} records')
+        return (self.offsets[2*index], self.offsets[2*index+1])
+
+    def is_current(self) -> bool:
+        '''
+        Whether the index matches the current data file.  The file size must
+        match.  If the modification time has changed, the file is hashed to
+        check whether its contents have changed, and if they have not, the
+        modification time in the index is updated.
+        '''
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        if stat.st_size != self.size:
+            return False
+        if stat.st_mtime_ns == self.mtime_ns:
+            return True
+        try:
+            if source_hash(self.path) != self.source_hash:
+                return False
+        except OSError:
+            return False
+        self.mtime_ns = stat.st_mtime_ns
+        return True
+
+    @classmethod
+    def build(cls, path: str | os.PathLike) -> RecordIndex:
+        '''
+        Scan a data file and create an index, without evaluating any data.
+        '''
+        path = pathlib.Path(path)
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = _map_file(f)
+            try:
+                _, pos = _load_leading_metadata(data)
+                scanner = RecordScanner(data, pos=pos)
+                if not scanner.start():
+                    raise Latex2PydataInvalidDataError('Record index requires data that is a list of dicts or a dict')
+                offsets = array.array('Q')
+                for start, end in scanner.iter_record_spans():
+                    offsets.append(start)
+                    offsets.append(end)
+                data_hash = content_hash(data)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        return cls(path, stat.st_size, stat.st_mtime_ns, data_hash, offsets)
+
+    def write(self) -> pathlib.Path:
+        '''
+        Save the index next to the data file, and return the index path.
+        '''
+        header = json.dumps({
+            'format_version': index_format_version,
+            'size': self.size,
+            'mtime_ns': self.mtime_ns,
+            'source_hash': self.source_hash,
+            'records': len(self),
+        }).encode('utf8')
+        offsets = self.offsets
+        if sys.byteorder != 'little':
+            offsets = array.array('Q', offsets)
+            offsets.byteswap()
+        path_index = index_path(self.path)
+        atomic_write(path_index, [index_magic, _header_length_struct.pack(len(header)), header, offsets.tobytes()])
+        return path_index
+
+    @classmethod
+    def read(cls, path: str | os.PathLike) -> RecordIndex | None:
+        '''
+        Read the saved index for a data file.  Return `None` if there is no
+        index or it is invalid.  This does not check whether the index is
+        current.
+        '''
+        path = pathlib.Path(path)
+        try:
+            f = open(index_path(path), 'rb')
+        except OSError:
+            return None
+        with f:
+            try:
+                if f.read(len(index_magic)) != index_magic:
+                    return None
+                header_length, = _header_length_struct.unpack(f.read(_header_length_struct.size))
+                header = json.loads(f.read(header_length).decode('utf8'))
+                if not isinstance(header, dict) or header.get('format_version') != index_format_version:
+                    return None
+                offsets = array.array('Q')
+                offsets.frombytes(f.read())
+                if sys.byteorder != 'little':
+                    offsets.byteswap()
+                if len(offsets) != 2 * header['records']:
+                    return None
+                return cls(path, header['size'], header['mtime_ns'], header['source_hash'], offsets)
+            except (struct.error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+                return None
+
+
+
+
+def build_index(path: str | os.PathLike) -> pathlib.Path:
+    '''
+    Create a record index for a UTF-8 data file, and save it next to the file
+    (`<name>.idx`).  Return the index path.
+    '''
+    return RecordIndex.build(path).write()
+
+
+def open_index(path: str | os.PathLike, update: bool = True) -> RecordIndex:
+    '''
+    Get the current record index for a data file.  If the saved index is
+    missing or out of date, a new index is built and saved (if possible)
+    with `update=True`, and `ValueError` is raised otherwise.
+    '''
+    index = RecordIndex.read(path)
+    if index is not None:
+        mtime_ns = index.mtime_ns
+        if index.is_current():
+            if update and index.mtime_ns != mtime_ns:
+                # Save the new modification time, so the file isn't hashed
+                # every time
+                try:
+                    index.write()
+                except OSError:
+                    pass
+            return index
+    if not update:
+        raise ValueError(f'Record index for "{path}" is missing or out of date')
+    index = RecordIndex.build(path)
+    try:
+        index.write()
+    except OSError:
+        # The index can still be used without being saved
+        pass
+    return index
+
+
+def load_record(path: str | os.PathLike,
+                index: int,
+                schema: dict[str, str] | CompiledSchema | None = None,
+                schema_missing: SchemaMissing | None = None,
+                update_index: bool = True) -> dict[str, Any]:
+    '''
+    Load a single top-level dict from a UTF-8 data file, using the record
+    index to read and decode only that dict.  Negative indices count from the
+    end.  The index is handled as in `open_index()`.
+    '''
+    return load_records(path, [index], schema, schema_missing, update_index)[0]
+
+
+def load_records(path: str | os.PathLike,
+                 indices: Iterable[int],
+                 schema: dict[str, str] | CompiledSchema | None = None,
+                 schema_missing: SchemaMissing | None = None,
+                 update_index: bool = True) -> list[dict[str, Any]]:
+    '''
+    Load selected top-level dicts from a UTF-8 data file, in the order given
+    by `indices`, as for `load_record()`.
+    '''
+    record_index = open_index(path, update_index)
+    spans = [record_index.span(index) for index in indices]
+    with open(record_index.path, 'rb') as f:
+        data = _map_file(f)
+        try:
+            metadata, _ = _load_leading_metadata(data)
+            decode_record = _record_decoder(_process_schema(metadata, schema, schema_missing), _DecodeOptions())
+            records = []
+            for start, end in spans:
+                try:
+                    raw_data_dict, raw_end = bytes_syntax.parse_raw_data_dict(data, start)
+                except IncompleteDataError:
+                    raw_end = None
+                if raw_end != end:
+                    raise Latex2PydataInvalidDataError(
+                        f'Record index for "{path}" does not match the data file (file changed during loading?)'
+                    )
+                records.append(decode_record(raw_data_dict))
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    return records
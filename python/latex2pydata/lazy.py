@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import collections.abc
+from typing import Any, Iterator, Union
+from .schema import CompiledSchema
+
+
+
+
+class LazyDict(collections.abc.Mapping):
+    '''
+    Read-only mapping that keeps raw string values from data, and only
+    evaluates and validates a value (according to the schema) the first time
+    it is accessed.  Decoded values are cached.  Key paths are represented
+    as nested `LazyDict`s.
+
+    `materialize()` decodes everything at once, so that any invalid values
+    raise errors immediately, and returns an ordinary `dict`.
+    '''
+    __slots__ = ('_schema', '_items', '_values')
+
+    def __init__(self, schema: CompiledSchema):
+        self._schema: CompiledSchema = schema
+        # Map keys to either `(<raw key>, <raw value>)` or a nested LazyDict.
+        # The full raw key (key path) is needed to look up the schema entry
+        # and for error messages.
+        self._items: dict[str, Union[tuple[str, str], LazyDict]] = {}
+        self._values: dict[str, Any] = {}
+
+    @classmethod
+    def from_raw_data_dict(cls, raw_data_dict: dict[str, str], schema: CompiledSchema,
+                           decoded: dict[str, Any] | None = None) -> LazyDict:
+        '''
+        Create a `LazyDict` from raw data.  As with ordinary loading, later
+        keys replace earlier keys.  That includes a value replacing a key path
+        prefix, or a key path replacing a value.  Values in `decoded`, keyed
+        by raw key, have already been decoded and are used as-is.
+        '''
+        lazy_dict = cls(schema)
+        for raw_k, raw_v in raw_data_dict.items():
+            if '.' not in raw_k:
+                loc = lazy_dict
+                key = raw_k
+            else:
+                keypath = raw_k.split('.')
+                loc = lazy_dict
+                for kp_elem in keypath[:-1]:
+                    sub_dict = loc._items.get(kp_elem)
+                    if not isinstance(sub_dict, LazyDict):
+                        sub_dict = cls(schema)
+                        loc._items[kp_elem] = sub_dict
+                        loc._values.pop(kp_elem, None)
+                    loc = sub_dict
+                key = keypath[-1]
+            loc._items[key] = (raw_k, raw_v)
+            if decoded is not None and raw_k in decoded:
+                loc._values[key] = decoded[raw_k]
+        return lazy_dict
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        item = self._items[key]
+        if isinstance(item, LazyDict):
+            value = item
+        else:
+            raw_k, raw_v = item
+            value = self._schema.get_decoder(raw_k)(raw_k, raw_v)
+        self._values[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._items
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({{{", ".join(repr(k) for k in self._items)}}})'
+
+    def is_decoded(self, key: str) -> bool:
+        '''
+        Whether the value for a key has already been decoded.
+        '''
+        return key in self._values
+
+    def get_raw(self, key: str) -> str | LazyDict:
+        '''
+        Get the raw string value for a key, without decoding it.  For a key
+        path prefix, this returns the nested `LazyDict`.
+        '''
+        item = self._items[key]
+        if isinstance(item, LazyDict):
+            return item
+        return item[1]
+
+    def materialize(self) -> dict[str, Any]:
+        '''
+        Decode all values, including those in nested key paths, and return
+        them as an ordinary `dict`.
+        '''
+        data_dict = {}
+        for key in self._items:
+            value = self[key]
+            if isinstance(value, LazyDict):
+                value = value.materialize()
+            data_dict[key] = value
+        return data_dict
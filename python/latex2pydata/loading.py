@@ -11,142 +11,910 @@
 from __future__ import annotations
 
 import ast
+import codecs
+import concurrent.futures
+import functools
 import io
+import mmap
+import os
 import pathlib
+import pickle
 import re
-from typing import Any, Literal
-from .err import Latex2PydataInvalidMetadataError, Latex2PydataSchemaError, Latex2PydataInvalidDataError
-from .schema import annot_re, validator_dict
+import sys
+import time
+from typing import Any, Callable, Iterable, Iterator, Literal, NamedTuple
+from .err import Latex2PydataInvalidMetadataError, Latex2PydataInvalidDataError
+from .cache import ParseCache, default_cache_max_size
+from . import sidecar as sidecar_module
+from .lazy import LazyDict
+from .records import RecordType, record_builder, record_spec
+from .schema import CompiledSchema, Decoder, SchemaMissing, compile_schema
+from .stats import LoadStats
+from .scanning import RecordScanner, check_raw_data_dict, default_chunk_size, keypath_re, raw_data_type_error_message
 
 
 
 
 metadata_comment_pattern = '# latex2pydata metadata:'
+metadata_comment_pattern_bytes = metadata_comment_pattern.encode('ascii')
+line_re_bytes = re.compile(b'[^\n]*')
 
-key_pattern = r'[A-Za-z_][0-9A-Za-z_]*'
-keypath_pattern = rf'{key_pattern}(?:\.{key_pattern})*'
-keypath_re = re.compile(keypath_pattern)
+
+
+
+Parser = Literal['scan', 'literal_eval']
 
 
 
 
 def load(readable: pathlib.Path | io.BytesIO | io.TextIOBase,
          encoding: str | None = None,
-         schema: dict[str, str] | None = None,
-         schema_missing: Literal['error'] | Literal['verbatim'] | Literal['evalany'] | None = None) -> dict[str, Any] | list[dict[str, Any]]:
+         schema: dict[str, str] | CompiledSchema | None = None,
+         schema_missing: SchemaMissing | None = None,
+         parser: Parser = 'scan',
+         lazy: bool = False,
+         cache_dir: str | os.PathLike | None = None,
+         cache_max_size: int = default_cache_max_size,
+         stats: LoadStats | None = None,
+         sidecar: bool = False,
+         intern: bool = False,
+         record_type: RecordType = 'dict',
+         keys: Iterable[str] | None = None,
+         where: Callable[[dict[str, Any]], bool] | None = None,
+         where_keys: Iterable[str] | None = None,
+         workers: int | None = 1,
+         executor: concurrent.futures.Executor | None = None) -> Any:
+    '''
+    Load data from a file.
+
+    UTF-8 data (the default) is parsed directly from bytes, and only
+    individual keys and values are decoded.  For `pathlib.Path`, the file is
+    memory mapped rather than read into memory.
+
+    If `cache_dir` is set, loaded data is cached on disk, keyed by a hash of
+    the file contents plus loading settings.  Data that is unchanged is then
+    loaded from the cache without being parsed again.  The cache is limited
+    to `cache_max_size` bytes, with least recently used entries removed
+    first.  Cache entries are pickled, so `cache_dir` must only be writable
+    by trusted processes.
+
+    If `stats` is a `LoadStats` instance, timing and counters are recorded
+    in it.
+
+    With `sidecar=True` and `pathlib.Path`, if there is a sidecar file
+    created by `write_sidecar()` that matches the current file contents and
+    loading settings, data is loaded from it instead of being parsed.
+    Sidecar files are not used with `lazy=True`.  Sidecar files use the
+    `marshal` format, which is not safe for untrusted data, so only enable
+    this when the directory containing the data file is only writable by
+    trusted processes.
+
+    With `intern=True`, keys and repeated values are shared between dicts,
+    as for `loads()`.  `record_type`, `keys`, `where`, `where_keys`,
+    `workers`, and `executor` are also the same as for `loads()`.  Sidecar files are only used with the
+    default `record_type='dict'` and without `keys` or `where`.
+    '''
+    selection = keys is not None or where is not None
+    if (sidecar and not lazy and record_type == 'dict' and not selection and
+            isinstance(readable, pathlib.Path)):
+        if stats is not None:
+            start_time = time.perf_counter()
+        hit, data = sidecar_module.read_sidecar(
+            readable, functools.partial(_sidecar_fingerprint, encoding, schema, schema_missing)
+        )
+        if hit:
+            if stats is not None:
+                stats.sidecar_hits += 1
+                stats.add_time('total', time.perf_counter() - start_time)
+            return data
+    if cache_dir is not None:
+        if lazy:
+            raise TypeError('Cannot combine "lazy" with "cache_dir"')
+        if record_type != 'dict':
+            raise TypeError('Cannot combine "record_type" with "cache_dir"')
+        if selection:
+            raise TypeError('Cannot combine "keys" or "where" with "cache_dir"')
+        cache = ParseCache(cache_dir, cache_max_size)
+        return _load_cached(readable, encoding, schema, schema_missing, parser, cache, stats, intern,
+                            workers, executor)
+    return _load_readable(readable, encoding,
+                          functools.partial(loads, schema=schema, schema_missing=schema_missing,
+                                            parser=parser, lazy=lazy, stats=stats, intern=intern,
+                                            record_type=record_type, keys=keys, where=where,
+                                            where_keys=where_keys, workers=workers, executor=executor),
+                          stats)
+
+
+def write_sidecar(path: str | os.PathLike,
+                  encoding: str | None = None,
+                  schema: dict[str, str] | CompiledSchema | None = None,
+                  schema_missing: SchemaMissing | None = None,
+                  parser: Parser = 'scan') -> pathlib.Path:
+    '''
+    Load a data file, and save the loaded data in a binary sidecar file next
+    to it (`<name>.bin`).  Return the sidecar path.
+
+    The sidecar contains a hash of the data file and a fingerprint of the
+    loading settings.  `load(..., sidecar=True)` uses the sidecar instead of
+    parsing the data file, as long as the data file is unchanged and the same
+    settings are used.  The sidecar uses the `marshal` format, so it is only
+    used with the same Python version that created it.
+    '''
+    path = pathlib.Path(path)
+    if schema is not None and not isinstance(schema, CompiledSchema):
+        schema = compile_schema(schema)
+    content = path.read_bytes()
+    data = loads(_decode_file_content(content, encoding, True), schema, schema_missing, parser)
+    return sidecar_module.write_sidecar_data(path, data, sidecar_module.content_hash(content),
+                                             _sidecar_fingerprint(encoding, schema, schema_missing))
+
+
+def _sidecar_fingerprint(encoding: str | None,
+                         schema: dict[str, str] | CompiledSchema | None,
+                         schema_missing: SchemaMissing | None) -> str:
+    if schema is not None and not isinstance(schema, CompiledSchema):
+        schema = compile_schema(schema)
+    return sidecar_module.settings_fingerprint(
+        None if _is_utf8(encoding) else codecs.lookup(encoding).name,
+        None if schema is None else schema.fingerprint,
+        schema_missing,
+    )
+
+
+def _decode_file_content(content: bytes, encoding: str | None, universal_newlines: bool) -> bytes | str:
+    # Prepare file contents for `loads()`.  UTF-8 is parsed from bytes.
+    if _is_utf8(encoding):
+        return content
+    string = content.decode(encoding)
+    if universal_newlines and '\r' in string:
+        # Match the universal newlines mode of `Path.read_text()`
+        string = string.replace('\r\n', '\n').replace('\r', '\n')
+    return string
+
+
+def _load_readable(readable: pathlib.Path | io.BytesIO | io.TextIOBase,
+                   encoding: str | None,
+                   load_string: Callable[[str | bytes | mmap.mmap], Any],
+                   stats: LoadStats | None = None) -> Any:
+    '''
+    Read data from a file, and pass it to `load_string()` as bytes or a
+    memory map for UTF-8, and otherwise as a string.
+    '''
+    if stats is not None:
+        start_time = time.perf_counter()
+        def load_string_timed(data: str | bytes | mmap.mmap, load_string=load_string) -> Any:
+            if not isinstance(data, mmap.mmap):
+                stats.add_time('read', time.perf_counter() - start_time)
+            return load_string(data)
+        load_string = load_string_timed
     if isinstance(readable, pathlib.Path):
-        encoding = encoding or 'utf-8-sig'
-        return loads(readable.read_text(encoding=encoding), schema, schema_missing)
+        if _is_utf8(encoding):
+            # Parse UTF-8 directly from a memory map, without reading and
+            # decoding the whole file
+            with open(readable, 'rb') as f:
+                try:
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty files cannot be mapped
+                    return load_string(b'')
+                with buffer:
+                    return load_string(buffer)
+        return load_string(readable.read_text(encoding=encoding))
     raw_read: bytes | str = readable.read()
     if isinstance(raw_read, bytes):
-        encoding = encoding or 'utf-8-sig'
-        return loads(raw_read.decode(encoding), schema, schema_missing)
+        if _is_utf8(encoding):
+            return load_string(raw_read)
+        return load_string(raw_read.decode(encoding))
     if isinstance(raw_read, str):
         if encoding is not None:
             raise TypeError(f'Cannot specify encoding "{encoding}" for a readable that returns a string')
-        return loads(raw_read, schema, schema_missing)
+        return load_string(raw_read)
     raise TypeError
 
 
-def loads(string: str,
-          schema: dict[str, str] | None = None,
-          schema_missing: Literal['error'] | Literal['verbatim'] | Literal['evalany'] | None = None) -> dict[str, Any] | list[dict[str, Any]]:
+def _load_cached(readable: pathlib.Path | io.BytesIO | io.TextIOBase,
+                 encoding: str | None,
+                 schema: dict[str, str] | CompiledSchema | None,
+                 schema_missing: SchemaMissing | None,
+                 parser: Parser,
+                 cache: ParseCache,
+                 stats: LoadStats | None,
+                 intern: bool,
+                 workers: int | None,
+                 executor: concurrent.futures.Executor | None) -> dict[str, Any] | list[dict[str, Any]]:
+    raw_read: bytes | str
+    if isinstance(readable, pathlib.Path):
+        raw_read = readable.read_bytes()
+    else:
+        raw_read = readable.read()
+    if isinstance(raw_read, bytes):
+        content = raw_read
+    elif isinstance(raw_read, str):
+        if encoding is not None:
+            raise TypeError(f'Cannot specify encoding "{encoding}" for a readable that returns a string')
+        content = raw_read.encode('utf8')
+    else:
+        raise TypeError
+    if schema is not None and not isinstance(schema, CompiledSchema):
+        schema = compile_schema(schema)
+    key = ParseCache.key(content, isinstance(raw_read, str), encoding,
+                         None if schema is None else schema.fingerprint, schema_missing)
+    hit, data = cache.get(key)
+    if hit:
+        if stats is not None:
+            stats.load_cache_hits += 1
+        return data
+    string: bytes | str
+    if isinstance(raw_read, bytes):
+        string = _decode_file_content(raw_read, encoding, isinstance(readable, pathlib.Path))
+    else:
+        string = raw_read
+    data = loads(string, schema, schema_missing, parser, stats=stats, intern=intern, workers=workers,
+                 executor=executor)
+    cache.set(key, data)
+    return data
+
+
+def loads(string: str | bytes | bytearray | memoryview | mmap.mmap,
+          schema: dict[str, str] | CompiledSchema | None = None,
+          schema_missing: SchemaMissing | None = None,
+          parser: Parser = 'scan',
+          lazy: bool = False,
+          stats: LoadStats | None = None,
+          intern: bool = False,
+          record_type: RecordType = 'dict',
+          keys: Iterable[str] | None = None,
+          where: Callable[[dict[str, Any]], bool] | None = None,
+          where_keys: Iterable[str] | None = None,
+          workers: int | None = 1,
+          executor: concurrent.futures.Executor | None = None) -> Any:
+    '''
+    Load data from a string.
+
+    By default, raw data is parsed with a scanner that is specific to the
+    `dict[str, str]` and `list[dict[str, str]]` data written by the LaTeX
+    package.  `parser='literal_eval'` instead uses `ast.literal_eval()` for
+    each top-level dict; this is slower but may be useful as a reference.
+
+    With `lazy=True`, each dict is a `LazyDict` that keeps raw string values
+    and only decodes and validates each value the first time it is accessed.
+
+    Data may also be a bytes-like object (`bytes`, `bytearray`, `memoryview`,
+    `mmap.mmap`) containing UTF-8, with optional BOM.  In that case, only
+    individual keys and values are decoded, as they are extracted.
+
+    If `stats` is a `LoadStats` instance, timing and counters are recorded
+    in it.
+
+    With `intern=True`, dicts share key strings, and repeated immutable
+    values (`int`, `float`, and `str` or `bytes` up to
+    `max_interned_length`) are stored once and shared.  This reduces memory
+    use for long lists of dicts with similar data.
+
+    `record_type` determines how each dict in the data is returned:
+
+     *  `dict` (default):  a `dict`, with nested dicts for key paths.
+     *  `namedtuple`:  a namedtuple, with nested namedtuples for key paths.
+     *  `slots`:  an instance of a class with `__slots__`, with nested dicts
+        for key paths.
+     *  `nested`:  an instance of a class with `__slots__`, with nested
+        instances of classes with `__slots__` for key paths.
+
+    Record classes are generated from the schema keys, and cached.  All keys
+    in data must be in the schema, and fields for keys that are missing from
+    data are `None`.
+
+    `keys` and `where` select data during loading, so that values and dicts
+    that are not selected are never decoded or validated:
+
+     *  `keys` is an iterable of keys or key paths.  Only keys that match, or
+        key paths that begin with a match followed by `.`, are kept.
+     *  `where` is a function that is called for each dict, and the dict is
+        only kept if it returns `True`.  By default, the function is called
+        with the raw `dict[str, str]`.  If `where_keys` is an iterable of
+        (raw) keys, it is instead called with a dict of the decoded values
+        for those keys, omitting any that are missing.
+
+    If the data is a single dict rather than a list and `where` rejects it,
+    the result is `None`.
+
+    With `workers` greater than 1 (or `None` for `os.cpu_count()`), a list
+    of dicts is split into chunks that are decoded in parallel, in a process
+    pool (or a thread pool when Python is running without the GIL).  Errors
+    are the same as with serial loading.  Small lists are always loaded
+    serially.  `workers` cannot be combined with `lazy`, `stats`, or
+    `record_type`, and `where` must be picklable for a process pool.
+
+    By default, a new pool is created for each call with `workers`.  To
+    reuse a pool, pass a `concurrent.futures.Executor` as `executor`, with
+    `workers` set to its number of workers.  The executor is not shut down.
+    '''
+    if stats is not None:
+        stats_counts = stats.begin(string)
 
-    if string.startswith(metadata_comment_pattern):
-        metadata_str = string[len(metadata_comment_pattern):string.find('\n')].strip()
+    metadata, pos = _load_leading_metadata(string)
+    schema = _process_schema(metadata, schema, schema_missing)
+    if stats is not None:
+        stats.add_time('metadata', time.perf_counter() - stats_counts.start_time)
+
+    options = _DecodeOptions(lazy, stats, intern, record_type, *_selection(keys, where, where_keys))
+    if executor is not None and workers == 1:
+        raise TypeError('"executor" requires "workers" other than 1')
+    if workers != 1:
+        if workers is not None and workers < 1:
+            raise ValueError('"workers" must be a positive integer')
+        if lazy or stats is not None or record_type != 'dict':
+            raise TypeError('Cannot combine "workers" with "lazy", "stats", or "record_type"')
+        data = _loads_parallel(string, pos, schema, parser, options, workers, executor)
+        if data is not None:
+            return data
+
+    scanner = RecordScanner(string, pos=pos)
+    decode_record = _record_decoder(schema, options)
+    raw_data_dicts = _iter_raw_data_dicts(scanner, parser)
+    if stats is not None:
+        raw_data_dicts = stats.timed_iter(raw_data_dicts, 'parse')
+    data = list(_decode_selected(raw_data_dicts, schema, options, decode_record))
+
+    if not scanner.top_is_list:
+        data = data.pop() if data else None
+
+    if stats is not None:
+        stats.end(stats_counts)
+    return data
+
+
+def iterload(readable: pathlib.Path | io.BytesIO | io.TextIOBase,
+             encoding: str | None = None,
+             schema: dict[str, str] | CompiledSchema | None = None,
+             schema_missing: SchemaMissing | None = None,
+             parser: Parser = 'scan',
+             lazy: bool = False,
+             chunk_size: int = default_chunk_size,
+             stats: LoadStats | None = None,
+             intern: bool = False,
+             record_type: RecordType = 'dict',
+             keys: Iterable[str] | None = None,
+             where: Callable[[dict[str, Any]], bool] | None = None,
+             where_keys: Iterable[str] | None = None) -> Iterator[Any]:
+    '''
+    Iterate over the top-level dicts in a file, yielding each dict as soon as
+    it has been read and processed.  If the data is a single dict rather than
+    a list of dicts, then that dict is the only value yielded.
+
+    Data is read in chunks of (at least) `chunk_size` characters, so memory
+    use is proportional to the largest dict rather than to the whole file.
+    With `intern=True`, values are shared between all dicts yielded, and
+    `record_type` determines the type of each value yielded, as for
+    `loads()`.  `keys`, `where`, and `where_keys` select data as for
+    `loads()`.
+    '''
+    options = _DecodeOptions(lazy, stats, intern, record_type, *_selection(keys, where, where_keys))
+    if isinstance(readable, pathlib.Path):
+        with readable.open(encoding=encoding or 'utf-8-sig') as f:
+            yield from _iterload_text(f, schema, schema_missing, parser, chunk_size, options)
+        return
+    if isinstance(readable, io.TextIOBase):
+        if encoding is not None:
+            raise TypeError(f'Cannot specify encoding "{encoding}" for a readable that returns a string')
+        yield from _iterload_text(readable, schema, schema_missing, parser, chunk_size, options)
+        return
+    text_readable = io.TextIOWrapper(readable, encoding=encoding or 'utf-8-sig')
+    try:
+        yield from _iterload_text(text_readable, schema, schema_missing, parser, chunk_size, options)
+    finally:
+        # Don't close the underlying binary readable along with the wrapper
+        text_readable.detach()
+
+
+def iterloads(string: str | bytes | bytearray | memoryview | mmap.mmap,
+              schema: dict[str, str] | CompiledSchema | None = None,
+              schema_missing: SchemaMissing | None = None,
+              parser: Parser = 'scan',
+              lazy: bool = False,
+              stats: LoadStats | None = None,
+              intern: bool = False,
+              record_type: RecordType = 'dict',
+              keys: Iterable[str] | None = None,
+              where: Callable[[dict[str, Any]], bool] | None = None,
+              where_keys: Iterable[str] | None = None) -> Iterator[Any]:
+    '''
+    Iterate over the top-level dicts in a string, yielding each dict as soon
+    as it has been processed.  If the data is a single dict rather than a list
+    of dicts, then that dict is the only value yielded.
+
+    Data may also be a bytes-like object containing UTF-8, as for `loads()`.
+    Other arguments are the same as for `loads()`.
+    '''
+    options = _DecodeOptions(lazy, stats, intern, record_type, *_selection(keys, where, where_keys))
+    if stats is not None:
+        stats_counts = stats.begin(string)
+    metadata, pos = _load_leading_metadata(string)
+    schema = _process_schema(metadata, schema, schema_missing)
+    if stats is not None:
+        stats.add_time('metadata', time.perf_counter() - stats_counts.start_time)
+    decode_record = _record_decoder(schema, options)
+    raw_data_dicts = _iter_raw_data_dicts(RecordScanner(string, pos=pos), parser)
+    if stats is None:
+        yield from _decode_selected(raw_data_dicts, schema, options, decode_record)
+        return
+    try:
+        yield from _decode_selected(stats.timed_iter(raw_data_dicts, 'parse'), schema, options, decode_record)
+    finally:
+        stats.end(stats_counts)
+
+
+def _iterload_text(readable: io.TextIOBase,
+                   schema: dict[str, str] | CompiledSchema | None,
+                   schema_missing: SchemaMissing | None,
+                   parser: Parser,
+                   chunk_size: int,
+                   options: _DecodeOptions) -> Iterator[dict[str, Any]]:
+    stats = options.stats
+    if stats is not None:
+        stats_counts = stats.begin()
+    first_line = readable.readline()
+    if first_line.startswith(metadata_comment_pattern):
+        metadata = _load_metadata(first_line[len(metadata_comment_pattern):])
+        first_line = ''
+    else:
+        metadata = None
+    schema = _process_schema(metadata, schema, schema_missing)
+    if stats is not None:
+        stats.add_time('metadata', time.perf_counter() - stats_counts.start_time)
+    scanner = RecordScanner(first_line, readable.read, chunk_size)
+    decode_record = _record_decoder(schema, options)
+    raw_data_dicts = _iter_raw_data_dicts(scanner, parser)
+    if stats is None:
+        yield from _decode_selected(raw_data_dicts, schema, options, decode_record)
+        return
+    # Data is read as it is parsed, so reading is included in parse time
+    try:
+        yield from _decode_selected(stats.timed_iter(raw_data_dicts, 'parse'), schema, options, decode_record)
+    finally:
+        stats.end(stats_counts)
+
+
+def _iter_raw_data_dicts(scanner: RecordScanner, parser: Parser) -> Iterator[dict[str, str]]:
+    # `scanner.top_is_list` is set before the first dict is yielded
+    if parser not in ('scan', 'literal_eval'):
+        raise ValueError(f'Invalid parser "{parser}"')
+    if not scanner.start():
+        # Data that does not begin with a list or dict is invalid, unless it
+        # is an unusual but valid literal like a parenthesized list.  Fall
+        # back to evaluating everything at once.
         try:
-            metadata = ast.literal_eval(metadata_str)
+            raw_data = ast.literal_eval(scanner.read_remaining())
         except Exception as e:
-            raise Latex2PydataInvalidMetadataError(f'Loading metadata failed:\n{e}')
-        if not isinstance(metadata, dict):
-            raise Latex2PydataInvalidMetadataError('Invalid metadata (must be a dict)')
+            raise Latex2PydataInvalidDataError(f'Loading data with ast.literal_eval() failed:\n{e}')
+        if isinstance(raw_data, list):
+            scanner.top_is_list = True
+        elif isinstance(raw_data, dict):
+            scanner.top_is_list = False
+            raw_data = [raw_data]
+        else:
+            raise Latex2PydataInvalidDataError(raw_data_type_error_message)
+        for obj in raw_data:
+            check_raw_data_dict(obj)
+        yield from raw_data
+        return
+    if parser == 'scan':
+        yield from scanner.iter_raw_data_dicts()
+        return
+    for record in scanner.iter_record_strings():
+        try:
+            raw_data_dict = ast.literal_eval(record)
+        except Exception as e:
+            raise Latex2PydataInvalidDataError(f'Loading data with ast.literal_eval() failed:\n{e}')
+        check_raw_data_dict(raw_data_dict)
+        yield raw_data_dict
+
+
+def _is_utf8(encoding: str | None) -> bool:
+    if encoding is None:
+        return True
+    try:
+        return codecs.lookup(encoding).name in ('utf-8', 'utf-8-sig')
+    except LookupError:
+        return False
+
+
+def _load_leading_metadata(string: str | bytes | bytearray | memoryview | mmap.mmap) -> tuple[dict[str, Any] | None, int]:
+    # Load metadata, if any, and return it along with the position at which
+    # data scanning should begin.  Bytes-like data may begin with a UTF-8
+    # BOM, which is skipped, following the `utf-8-sig` codec.
+    if isinstance(string, str):
+        if not string.startswith(metadata_comment_pattern):
+            return (None, 0)
+        end = string.find('\n')
+        if end < 0:
+            end = len(string)
+        return (_load_metadata(string[len(metadata_comment_pattern):end]), 0)
+    pos = len(codecs.BOM_UTF8) if string[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8 else 0
+    if string[pos:pos+len(metadata_comment_pattern_bytes)] != metadata_comment_pattern_bytes:
+        return (None, pos)
+    end = line_re_bytes.match(string, pos).end()
+    metadata_bytes = bytes(string[pos+len(metadata_comment_pattern_bytes):end])
+    try:
+        metadata_str = metadata_bytes.decode('utf8')
+    except UnicodeDecodeError as e:
+        raise Latex2PydataInvalidMetadataError(f'Loading metadata failed:\n{e}')
+    return (_load_metadata(metadata_str), pos)
+
+
+def _load_metadata(metadata_str: str) -> dict[str, Any]:
+    try:
+        metadata = ast.literal_eval(metadata_str.strip())
+    except Exception as e:
+        raise Latex2PydataInvalidMetadataError(f'Loading metadata failed:\n{e}')
+    if not isinstance(metadata, dict):
+        raise Latex2PydataInvalidMetadataError('Invalid metadata (must be a dict)')
+    return metadata
+
+
+def _process_schema(metadata: dict[str, Any] | None,
+                    schema: dict[str, str] | CompiledSchema | None,
+                    schema_missing: SchemaMissing | None) -> CompiledSchema:
+    # Precedence:  arguments, then settings in a compiled schema, then
+    # metadata.  Compiled schemas are cached, so schemas embedded in metadata
+    # are only compiled once.
+    if isinstance(schema, CompiledSchema):
+        if schema_missing is None:
+            schema_missing = schema.schema_missing
+        if schema_missing is None and metadata is not None:
+            schema_missing = metadata.get('schema_missing')
+        return schema.with_schema_missing(schema_missing)
+    if metadata is not None:
         if schema is None and 'schema' in metadata:
             schema = metadata['schema']
         if schema_missing is None and 'schema_missing' in metadata:
             schema_missing = metadata['schema_missing']
-    if schema is not None:
-        if not isinstance(schema, dict):
-            raise Latex2PydataSchemaError('Invalid schema (must be dict[str, str])')
-        if not all(isinstance(k, str) and isinstance(v, str) for k, v in schema.items()):
-            raise Latex2PydataSchemaError('Invalid schema (must be dict[str, str])')
-        schema = {k: v.replace(' ', '') for k, v in schema.items()}
-        for k, v in schema.items():
-            if not keypath_re.fullmatch(k):
-                raise Latex2PydataSchemaError(f'Invalid or unsupported schema key "{k}"')
-            if v != 'verbatim' and not annot_re.fullmatch(v):
-                raise Latex2PydataSchemaError(
-                    f'Invalid or unsupported schema value (type annotation) "{v}"'
-                )
-    if schema_missing == 'rawstr':
-        # Backward compatibility for < v0.5.0
-        schema_missing = 'verbatim'
-    if schema_missing is None:
-        schema_missing = 'error'
-    elif schema_missing not in ('error', 'verbatim', 'evalany'):
-        raise Latex2PydataInvalidMetadataError(f'Invalid "schema_missing" value "{schema_missing}"')
+    return compile_schema(schema, schema_missing)
 
-    try:
-        raw_data: dict[str, str] | list[dict[str, str]] = ast.literal_eval(string)
-    except Exception as e:
-        raise Latex2PydataInvalidDataError(f'Loading data with ast.literal_eval() failed:\n{e}')
-    top_is_list: bool
-    if isinstance(raw_data, list):
-        top_is_list = True
-        raw_data_list = raw_data
-    elif isinstance(raw_data, dict):
-        top_is_list = False
-        raw_data_list = [raw_data]
-    else:
-        raise Latex2PydataInvalidDataError(
-            'Before any schema is applied, data must be dict[str, str] or list[dict[str, str]]'
-        )
-    for obj in raw_data_list:
-        if not isinstance(obj, dict):
-            raise Latex2PydataInvalidDataError(
-                'Before any schema is applied, data must be dict[str, str] or list[dict[str, str]]'
-            )
-        for k, v in obj.items():
-            if not isinstance(k, str) or not isinstance(v, str):
-                raise Latex2PydataInvalidDataError(
-                    'Before any schema is applied, data must be dict[str, str] or list[dict[str, str]]'
-                )
-            if not keypath_re.fullmatch(k):
-                raise Latex2PydataInvalidDataError(f'Unsupported key name "{k}"')
 
-    data = []
-    for raw_data_dict in raw_data_list:
-        data_dict = {}
-        data.append(data_dict)
-        for raw_k, raw_v in raw_data_dict.items():
-            if schema is None:
-                v = raw_v
-            elif raw_k in schema:
-                value_type_annot = schema[raw_k]
-                if value_type_annot == 'verbatim':
-                    v = raw_v
-                else:
-                    try:
-                        v = ast.literal_eval(raw_v)
-                    except Exception as e:
-                        raise Latex2PydataInvalidDataError(f'Invalid value for key "{raw_k}":\n{e}')
-                    if not validator_dict[value_type_annot](v):
-                        raise Latex2PydataInvalidDataError(f'Key "{raw_k}" should have value with type "{value_type_annot}"')
-            elif schema_missing == 'error':
-                raise Latex2PydataInvalidDataError(f'Key "{raw_k}" is missing a schema entry')
-            elif schema_missing == 'verbatim':
-                v = raw_v
-            elif schema_missing == 'evalany':
-                try:
-                    v = ast.literal_eval(raw_v)
-                except Exception as e:
-                    raise Latex2PydataInvalidDataError(f'Invalid value for key "{raw_k}":\n{e}')
+class _DecodeOptions(NamedTuple):
+    # Settings that determine how raw dicts are converted into results
+    lazy: bool = False
+    stats: LoadStats | None = None
+    intern: bool = False
+    record_type: RecordType = 'dict'
+    keys: frozenset[str] | None = None
+    where: Callable[[dict[str, Any]], bool] | None = None
+    where_keys: tuple[str, ...] | None = None
+
+
+def _selection(keys: Iterable[str] | None,
+               where: Callable[[dict[str, Any]], bool] | None,
+               where_keys: Iterable[str] | None) -> tuple[frozenset[str] | None,
+                                                          Callable[[dict[str, Any]], bool] | None,
+                                                          tuple[str, ...] | None]:
+    # Check `keys`, `where`, and `where_keys`, and convert them for
+    # `_DecodeOptions`
+    if keys is not None:
+        if isinstance(keys, str):
+            raise TypeError('"keys" must be an iterable of keys, not a string')
+        keys = frozenset(keys)
+        for k in keys:
+            if not isinstance(k, str) or not keypath_re.fullmatch(k):
+                raise ValueError(f'Invalid key in "keys": {k!r}')
+    if where is not None and not callable(where):
+        raise TypeError('"where" must be callable')
+    if where_keys is not None:
+        if where is None:
+            raise TypeError('"where_keys" requires "where"')
+        if isinstance(where_keys, str):
+            raise TypeError('"where_keys" must be an iterable of keys, not a string')
+        where_keys = tuple(where_keys)
+    return (keys, where, where_keys)
+
+
+def _decode_selected(raw_data_dicts: Iterator[dict[str, str]], schema: CompiledSchema,
+                     options: _DecodeOptions, decode_record: Callable[..., Any]) -> Iterator[Any]:
+    '''
+    Apply `options.where` and `options.keys` to raw dicts, before anything
+    else is decoded, and decode the selected dicts with `decode_record`.
+    '''
+    keys, where, where_keys = options.keys, options.where, options.where_keys
+    if keys is None and where is None:
+        return map(decode_record, raw_data_dicts)
+    return _iter_decoded_selection(raw_data_dicts, schema, keys, where, where_keys, decode_record)
+
+
+def _iter_decoded_selection(raw_data_dicts: Iterator[dict[str, str]],
+                            schema: CompiledSchema,
+                            keys: frozenset[str] | None,
+                            where: Callable[[dict[str, Any]], bool] | None,
+                            where_keys: tuple[str, ...] | None,
+                            decode_record: Callable[..., Any]) -> Iterator[Any]:
+    # Whether each raw key is selected by `keys`.  Typically all dicts have
+    # the same keys, so this is only determined once per key.
+    selected: dict[str, bool] = {}
+    get_decoder = schema.get_decoder
+    for raw_data_dict in raw_data_dicts:
+        # Values decoded for `where_keys` are passed on to `decode_record`, so
+        # that they are not decoded again
+        decoded = None
+        if where is not None:
+            if where_keys is None:
+                where_arg = raw_data_dict
             else:
-                raise ValueError
-            if '.' not in raw_k:
-                data_dict[raw_k] = v
+                decoded = {k: get_decoder(k)(k, raw_data_dict[k]) for k in where_keys if k in raw_data_dict}
+                where_arg = dict(decoded)
+            if not where(where_arg):
                 continue
-            keypath = raw_k.split('.')
-            loc = data_dict
+        if keys is not None:
+            projected = {}
+            for raw_k, raw_v in raw_data_dict.items():
+                try:
+                    is_selected = selected[raw_k]
+                except KeyError:
+                    is_selected = raw_k in keys or any(raw_k[:index] in keys for index, char in enumerate(raw_k)
+                                                       if char == '.')
+                    selected[raw_k] = is_selected
+                if is_selected:
+                    projected[raw_k] = raw_v
+            raw_data_dict = projected
+        if decoded is None:
+            yield decode_record(raw_data_dict)
+        else:
+            yield decode_record(raw_data_dict, decoded=decoded)
+
+
+def _record_decoder(schema: CompiledSchema, options: _DecodeOptions) -> Callable[[dict[str, str]], Any]:
+    if options.lazy:
+        if options.stats is not None:
+            raise TypeError('Cannot combine "lazy" with "stats"')
+        if options.intern:
+            raise TypeError('Cannot combine "lazy" with "intern"')
+        if options.record_type != 'dict':
+            raise TypeError('Cannot combine "lazy" with "record_type"')
+        return functools.partial(LazyDict.from_raw_data_dict, schema=schema)
+    interner = Interner() if options.intern else None
+    if options.record_type != 'dict':
+        if options.stats is not None:
+            raise TypeError('Cannot combine "stats" with "record_type"')
+        return _RecordClassDecoder(schema, options.record_type, interner)
+    if options.stats is not None:
+        return _StatsRecordDecoder(schema, options.stats, interner)
+    return _RecordDecoder(schema, interner)
+
+
+
+
+# Maximum length of `str` and `bytes` values shared with `intern=True`.
+# Longer values are rarely repeated, and are expensive to hash and compare.
+max_interned_length = 64
+
+# Maximum number of distinct values of each type in an `Interner`.  Once this
+# is reached, new values are no longer added, so that data without repeated
+# values does not keep growing the table.
+max_interned_values = 2**16
+
+
+class Interner(object):
+    '''
+    Table of shared immutable values.  Calling an instance with a value
+    returns a previously seen equal value of the same type, if there is one.
+
+    Only `int`, `float`, `str`, and `bytes` are shared.  `bool` and `None`
+    are already singletons.  Containers are not shared, since equality does
+    not account for element types (`(1,) == (True,)`).
+    '''
+    __slots__ = ('tables',)
+
+    def __init__(self):
+        self.tables: dict[type, dict[Any, Any]] = {int: {}, float: {}, str: {}, bytes: {}}
+
+    def __call__(self, value: Any) -> Any:
+        table = self.tables.get(value.__class__)
+        if table is None:
+            return value
+        try:
+            return table[value]
+        except KeyError:
+            pass
+        if value.__class__ is float:
+            # `-0.0 == 0.0`, and NaN is never equal to a stored value
+            if not value or value != value:
+                return value
+        elif value.__class__ is not int and len(value) > max_interned_length:
+            return value
+        if len(table) < max_interned_values:
+            table[value] = value
+        return value
+
+
+# Maximum number of distinct key sets with nesting plans per loading call.
+# Records with other key sets are decoded with `_decode_raw_data_dict()`.
+max_nesting_plans = 64
+
+# Nested key path structure:  tuple of `(<key>, <value index | subtree>)`
+NestingTree = tuple  # tuple[tuple[str, Union[int, 'NestingTree']], ...]
+
+
+class NestingPlan(NamedTuple):
+    '''
+    Decoding plan for records with a given sequence of raw keys.  Decoders are
+    looked up once, and key paths are split once into a tree that determines
+    where each decoded value goes.  `tree` is `None` when there are no key
+    paths.
+    '''
+    keys: tuple[str, ...]
+    decoders: tuple[Decoder, ...]
+    tree: NestingTree | None
+
+
+def _nesting_plan(keys: tuple[str, ...], schema: CompiledSchema,
+                  interner: Interner | None = None) -> NestingPlan | None:
+    '''
+    Create a `NestingPlan` for a sequence of raw keys.  Return `None` if a
+    key is also a prefix of a key path, since then the result depends on key
+    order and must be handled by `_decode_raw_data_dict()`.  With an
+    `interner`, keys and key path elements are shared with other plans.
+    '''
+    if interner is not None:
+        keys = tuple(map(interner, keys))
+    decoders = tuple(schema.get_decoder(k) for k in keys)
+    if not any('.' in k for k in keys):
+        return NestingPlan(keys, decoders, None)
+    root: dict[str, Any] = {}
+    for index, raw_k in enumerate(keys):
+        keypath = raw_k.split('.')
+        if interner is not None:
+            keypath = [interner(kp_elem) for kp_elem in keypath]
+        node = root
+        for kp_elem in keypath[:-1]:
+            child = node.setdefault(kp_elem, {})
+            if not isinstance(child, dict):
+                return None
+            node = child
+        if keypath[-1] in node:
+            return None
+        node[keypath[-1]] = index
+    def freeze(node: dict[str, Any]) -> NestingTree:
+        return tuple((k, v if isinstance(v, int) else freeze(v)) for k, v in node.items())
+    return NestingPlan(keys, decoders, freeze(root))
+
+
+def _build_nested(tree: NestingTree, values: list[Any]) -> dict[str, Any]:
+    return {k: values[v] if isinstance(v, int) else _build_nested(v, values) for k, v in tree}
+
+
+def _decode_values(decoders: tuple[Decoder, ...], keys: tuple[str, ...], raw_data_dict: dict[str, str],
+                   interner: Interner | None, decoded: dict[str, Any] | None) -> list[Any]:
+    # Decode the values of a raw dict, in order.  Values in `decoded` have
+    # already been decoded (for `where_keys`).
+    if decoded is None:
+        if interner is None:
+            return [decode(k, v) for decode, k, v in zip(decoders, keys, raw_data_dict.values())]
+        return [interner(decode(k, v)) for decode, k, v in zip(decoders, keys, raw_data_dict.values())]
+    values = [decoded[k] if k in decoded else decode(k, v)
+              for decode, k, v in zip(decoders, keys, raw_data_dict.values())]
+    if interner is not None:
+        values = [interner(v) for v in values]
+    return values
+
+
+class _RecordDecoder(object):
+    '''
+    Decode raw dicts, reusing a `NestingPlan` for each distinct sequence of
+    raw keys.  In a list of dicts, typically all or most dicts have the same
+    keys, so key path splitting and decoder lookup happen only once.  Dicts
+    with the same plan share the plan's key strings.
+    '''
+    __slots__ = ('schema', 'plans', 'interner')
+
+    def __init__(self, schema: CompiledSchema, interner: Interner | None = None):
+        self.schema: CompiledSchema = schema
+        self.plans: dict[tuple[str, ...], NestingPlan | None] = {}
+        self.interner: Interner | None = interner
+
+    def __call__(self, raw_data_dict: dict[str, str], decoded: dict[str, Any] | None = None) -> dict[str, Any]:
+        keys = tuple(raw_data_dict)
+        try:
+            plan = self.plans[keys]
+        except KeyError:
+            if len(self.plans) >= max_nesting_plans:
+                plan = None
+            else:
+                plan = _nesting_plan(keys, self.schema, self.interner)
+                self.plans[keys] = plan
+        if plan is None:
+            return _decode_raw_data_dict(raw_data_dict, self.schema, self.interner, decoded)
+        values = _decode_values(plan.decoders, plan.keys, raw_data_dict, self.interner, decoded)
+        if plan.tree is None:
+            return dict(zip(plan.keys, values))
+        return _build_nested(plan.tree, values)
+
+
+class _RecordClassDecoder(object):
+    '''
+    Decode raw dicts into instances of record classes generated from the
+    schema.  A record builder is generated for each distinct sequence of raw
+    keys, like a `NestingPlan`.
+    '''
+    __slots__ = ('schema', 'spec', 'plans', 'interner')
+
+    def __init__(self, schema: CompiledSchema, record_type: RecordType, interner: Interner | None = None):
+        self.schema: CompiledSchema = schema
+        self.spec = record_spec(schema, record_type)
+        self.plans: dict[tuple[str, ...], tuple[tuple[Decoder, ...], Callable[[list[Any]], Any] | None]] = {}
+        self.interner: Interner | None = interner
+
+    def __call__(self, raw_data_dict: dict[str, str], decoded: dict[str, Any] | None = None) -> Any:
+        keys = tuple(raw_data_dict)
+        try:
+            decoders, build = self.plans[keys]
+        except KeyError:
+            decoders, build = tuple(self.schema.get_decoder(k) for k in keys), None
+        values = _decode_values(decoders, keys, raw_data_dict, self.interner, decoded)
+        if build is None:
+            # Values are decoded first, so that keys that are not in the
+            # schema give the usual errors for `schema_missing='error'`
+            build = record_builder(self.spec, keys)
+            if len(self.plans) < max_nesting_plans:
+                self.plans[keys] = (decoders, build)
+        return build(values)
+
+
+class _StatsRecordDecoder(object):
+    '''
+    Decode raw dicts while recording decode time for each value and the time
+    spent nesting key paths.
+    '''
+    __slots__ = ('schema', 'stats', 'interner')
+
+    def __init__(self, schema: CompiledSchema, stats: LoadStats, interner: Interner | None = None):
+        self.schema: CompiledSchema = schema
+        self.stats: LoadStats = stats
+        self.interner: Interner | None = interner
+
+    def __call__(self, raw_data_dict: dict[str, str], decoded: dict[str, Any] | None = None) -> dict[str, Any]:
+        perf_counter = time.perf_counter
+        stats = self.stats
+        get_decoder = self.schema.get_decoder
+        entries = self.schema.entries
+        interner = self.interner
+        start_time = perf_counter()
+        flat_dict = {}
+        for raw_k, raw_v in raw_data_dict.items():
+            entry = entries.get(raw_k)
+            value_start_time = perf_counter()
+            if decoded is not None and raw_k in decoded:
+                v = decoded[raw_k]
+            else:
+                v = get_decoder(raw_k)(raw_k, raw_v)
+            if interner is not None:
+                raw_k = interner(raw_k)
+                v = interner(v)
+            flat_dict[raw_k] = v
+            stats.add_annotation(stats.missing_annotation if entry is None else entry.annot,
+                                 perf_counter() - value_start_time)
+        nesting_start_time = perf_counter()
+        stats.add_time('decode', nesting_start_time - start_time)
+        data_dict = _nest_keypaths(flat_dict, interner)
+        stats.add_time('nesting', perf_counter() - nesting_start_time)
+        stats.records += 1
+        stats.values += len(raw_data_dict)
+        return data_dict
+
+
+def _keypath_conflict_error(raw_k: str) -> Latex2PydataInvalidDataError:
+    # A key path passes through a value that is not a dict
+    return Latex2PydataInvalidDataError(f'Key path "{raw_k}" conflicts with a key whose value is not a dict')
+
+
+def _nest_keypaths(flat_dict: dict[str, Any], interner: Interner | None = None) -> dict[str, Any]:
+    data_dict = {}
+    for k, v in flat_dict.items():
+        if '.' not in k:
+            data_dict[k] = v
+            continue
+        keypath = k.split('.')
+        if interner is not None:
+            keypath = [interner(kp_elem) for kp_elem in keypath]
+        loc = data_dict
+        try:
             for kp_elem in keypath[:-1]:
                 try:
                     loc = loc[kp_elem]
@@ -155,8 +923,146 @@ def loads(string: str,
                     loc[kp_elem] = new_dict
                     loc = new_dict
             loc[keypath[-1]] = v
+        except TypeError:
+            raise _keypath_conflict_error(k)
+    return data_dict
+
 
-    if not top_is_list:
-        data = data.pop()
+def _decode_raw_data_dict(raw_data_dict: dict[str, str], schema: CompiledSchema,
+                          interner: Interner | None = None,
+                          decoded: dict[str, Any] | None = None) -> dict[str, Any]:
+    data_dict = {}
+    get_decoder = schema.get_decoder
+    for raw_k, raw_v in raw_data_dict.items():
+        if decoded is not None and raw_k in decoded:
+            v = decoded[raw_k]
+        else:
+            v = get_decoder(raw_k)(raw_k, raw_v)
+        if interner is not None:
+            raw_k = interner(raw_k)
+            v = interner(v)
+        if '.' not in raw_k:
+            data_dict[raw_k] = v
+            continue
+        keypath = raw_k.split('.')
+        if interner is not None:
+            keypath = [interner(kp_elem) for kp_elem in keypath]
+        loc = data_dict
+        try:
+            for kp_elem in keypath[:-1]:
+                try:
+                    loc = loc[kp_elem]
+                except KeyError:
+                    new_dict = {}
+                    loc[kp_elem] = new_dict
+                    loc = new_dict
+            loc[keypath[-1]] = v
+        except TypeError:
+            raise _keypath_conflict_error(raw_k)
+    return data_dict
 
+
+
+
+# Minimum number of dicts in each chunk for parallel decoding.  Lists with
+# fewer than two chunks are decoded serially.
+min_parallel_chunk_records = 64
+
+# Number of chunks per worker for parallel decoding, so that work is spread
+# evenly when some chunks take longer than others
+parallel_chunks_per_worker = 4
+
+
+def _gil_disabled() -> bool:
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _loads_parallel(string: str | bytes | bytearray | memoryview | mmap.mmap,
+                    pos: int,
+                    schema: CompiledSchema,
+                    parser: Parser,
+                    options: _DecodeOptions,
+                    workers: int | None,
+                    executor: concurrent.futures.Executor | None) -> list[Any] | None:
+    '''
+    Decode a list of dicts in chunks in parallel, in `executor` or in a pool
+    created for this call.  The list is first scanned to find where each
+    dict begins and ends, without evaluating anything.  Return `None` if the
+    data should be loaded serially instead:  if there is only one worker, if
+    the data is not a list of dicts or is too short, or if the scan finds
+    invalid data (including an invalid `parser`), so that serial loading
+    reports the same error it always would.
+    '''
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or parser not in ('scan', 'literal_eval'):
+        return None
+    if executor is None:
+        use_processes = not _gil_disabled()
+    else:
+        use_processes = isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+    if use_processes and options.where is not None:
+        # Check before any work is done, rather than failing with a pickling
+        # error from the pool
+        try:
+            pickle.dumps(options.where)
+        except Exception as e:
+            raise ValueError(
+                f'"where" must be picklable to be used with "workers" in a process pool, '
+                f'such as a module-level function:\n{e}'
+            )
+    scanner = RecordScanner(string, pos=pos)
+    if not scanner.start() or not scanner.top_is_list:
+        return None
+    try:
+        spans = list(scanner.iter_record_spans())
+    except Latex2PydataInvalidDataError:
+        return None
+    chunk_count = min(workers * parallel_chunks_per_worker, len(spans) // min_parallel_chunk_records)
+    if chunk_count < 2:
+        return None
+    if isinstance(string, str):
+        open_list, close_list = '[', ']'
+    else:
+        open_list, close_list = b'[', b']'
+    chunk_size, remainder = divmod(len(spans), chunk_count)
+    chunk_strings = []
+    start_index = 0
+    for n in range(chunk_count):
+        end_index = start_index + chunk_size + (1 if n < remainder else 0)
+        # Each chunk is the text of its dicts (including the commas and any
+        # comments between them), wrapped as a list
+        chunk_strings.append(open_list + string[spans[start_index][0]:spans[end_index-1][1]] + close_list)
+        start_index = end_index
+    if executor is not None:
+        return _decode_chunks(executor, chunk_strings, schema, parser, options)
+    if use_processes:
+        executor_class = concurrent.futures.ProcessPoolExecutor
+    else:
+        executor_class = concurrent.futures.ThreadPoolExecutor
+    with executor_class(max_workers=min(workers, chunk_count)) as executor:
+        return _decode_chunks(executor, chunk_strings, schema, parser, options)
+
+
+def _decode_chunks(executor: concurrent.futures.Executor, chunk_strings: list[str | bytes],
+                   schema: CompiledSchema, parser: Parser, options: _DecodeOptions) -> list[Any]:
+    data = []
+    futures = [executor.submit(_decode_chunk, chunk_string, schema, parser, options)
+               for chunk_string in chunk_strings]
+    try:
+        # Results are collected in order, so the first error raised is the
+        # one from the earliest dict, as with serial loading
+        for future in futures:
+            data.extend(future.result())
+    finally:
+        for future in futures:
+            future.cancel()
     return data
+
+
+def _decode_chunk(chunk_string: str | bytes, schema: CompiledSchema, parser: Parser,
+                  options: _DecodeOptions) -> list[Any]:
+    decode_record = _record_decoder(schema, options)
+    raw_data_dicts = _iter_raw_data_dicts(RecordScanner(chunk_string), parser)
+    return list(_decode_selected(raw_data_dicts, schema, options, decode_record))
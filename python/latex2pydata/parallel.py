@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+import os
+import pathlib
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+from .loading import Parser, load
+from .schema import CompiledSchema, SchemaMissing, compile_schema
+from .validation import ValidationResult, validate_file
+
+
+
+
+class LoadResult(NamedTuple):
+    '''
+    Result of loading a single file with `load_many()`.  If loading failed,
+    `data` is `None` and `error` is the exception that was raised.
+    '''
+    path: pathlib.Path
+    data: Any
+    error: Exception | None
+
+
+
+
+# Settings for worker processes.  These are set once per process by the pool
+# initializer, so that a compiled schema is only sent to each worker once
+# rather than with every task.  The global is only used in pool processes;
+# serial loading passes `settings` to the worker function explicitly, so that
+# calls in the main process can't interfere with each other.
+_worker_settings: dict[str, Any] = {}
+
+def _init_worker(settings: dict[str, Any]):
+    _worker_settings.clear()
+    _worker_settings.update(settings)
+
+
+def _load_paths(paths: list[pathlib.Path],
+                settings: dict[str, Any] | None = None) -> list[tuple[Any, Exception | None]]:
+    if settings is None:
+        settings = _worker_settings
+    results = []
+    for path in paths:
+        try:
+            data = load(path, **settings)
+        except Exception as e:
+            results.append((None, e))
+        else:
+            results.append((data, None))
+    return results
+
+
+def _validate_paths(paths: list[pathlib.Path],
+                    settings: dict[str, Any] | None = None) -> list[ValidationResult]:
+    if settings is None:
+        settings = _worker_settings
+    results = []
+    for path in paths:
+        try:
+            result = validate_file(path, **settings)
+        except Exception as e:
+            result = ValidationResult(0, [e], path=path)
+        results.append(result)
+    return results
+
+
+def _map_chunks(worker: Callable[..., list[Any]],
+                paths: list[pathlib.Path],
+                settings: dict[str, Any],
+                workers: int | None,
+                chunksize: int,
+                ordered: bool) -> Iterator[tuple[pathlib.Path, Any]]:
+    # Run `worker` for chunks of paths in a process pool, yielding
+    # `(<path>, <result>)`
+    chunks = [paths[n:n+chunksize] for n in range(0, len(paths), chunksize)]
+    if workers == 1:
+        serial_worker = functools.partial(worker, settings=settings)
+        for chunk in chunks:
+            yield from zip(chunk, serial_worker(chunk))
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(settings,)) as executor:
+        future_chunks = {executor.submit(worker, chunk): chunk for chunk in chunks}
+        if ordered:
+            futures = iter(future_chunks)
+        else:
+            futures = concurrent.futures.as_completed(future_chunks)
+        try:
+            for future in futures:
+                yield from zip(future_chunks[future], future.result())
+        finally:
+            for future in future_chunks:
+                future.cancel()
+
+
+def _check_pool_args(workers: int | None, chunksize: int,
+                     schema: dict[str, str] | CompiledSchema | None) -> CompiledSchema | None:
+    if workers is not None and workers < 1:
+        raise ValueError('"workers" must be a positive integer')
+    if chunksize < 1:
+        raise ValueError('"chunksize" must be a positive integer')
+    if schema is not None and not isinstance(schema, CompiledSchema):
+        # Check the schema before starting any workers
+        schema = compile_schema(schema)
+    return schema
+
+
+
+
+def load_many(paths: Iterable[str | os.PathLike],
+              encoding: str | None = None,
+              schema: dict[str, str] | CompiledSchema | None = None,
+              schema_missing: SchemaMissing | None = None,
+              parser: Parser = 'scan',
+              workers: int | None = None,
+              chunksize: int = 1,
+              ordered: bool = True) -> Iterator[LoadResult]:
+    '''
+    Load multiple files in parallel with a pool of `workers` processes
+    (default `os.cpu_count()`), yielding a `LoadResult` for each file.
+
+    Results are yielded in the same order as `paths` by default, or as they
+    are completed with `ordered=False`.  Files are sent to workers in groups
+    of `chunksize`.  An error in one file is reported in its `LoadResult` and
+    does not prevent other files from being loaded.
+    '''
+    paths = [pathlib.Path(path) for path in paths]
+    schema = _check_pool_args(workers, chunksize, schema)
+    settings = dict(encoding=encoding, schema=schema, schema_missing=schema_missing, parser=parser)
+    for path, (data, error) in _map_chunks(_load_paths, paths, settings, workers, chunksize, ordered):
+        yield LoadResult(path, data, error)
+
+
+def validate_many(paths: Iterable[str | os.PathLike],
+                  encoding: str | None = None,
+                  schema: dict[str, str] | CompiledSchema | None = None,
+                  schema_missing: SchemaMissing | None = None,
+                  parser: Parser = 'scan',
+                  max_errors: int | None = None,
+                  workers: int | None = None,
+                  chunksize: int = 1,
+                  ordered: bool = True) -> Iterator[ValidationResult]:
+    '''
+    Check multiple files in parallel with `validate_file()`, yielding a
+    `ValidationResult` for each file.  Pool arguments are the same as for
+    `load_many()`.  Errors in reading a file are reported in the file's
+    `ValidationResult` (without `record` and `key` attributes).
+    '''
+    paths = [pathlib.Path(path) for path in paths]
+    schema = _check_pool_args(workers, chunksize, schema)
+    if max_errors is not None and max_errors < 1:
+        raise ValueError('"max_errors" must be a positive integer')
+    settings = dict(encoding=encoding, schema=schema, schema_missing=schema_missing, parser=parser,
+                      max_errors=max_errors)
+    for _, result in _map_chunks(_validate_paths, paths, settings, workers, chunksize, ordered):
+        yield result
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import collections
+import keyword
+from typing import Any, Callable, Literal, NamedTuple
+from .err import Latex2PydataInvalidDataError, Latex2PydataSchemaError
+from .schema import CompiledSchema
+from .util import LRUCache
+
+
+
+
+RecordType = Literal['dict', 'namedtuple', 'slots', 'nested']
+record_types = ('dict', 'namedtuple', 'slots', 'nested')
+
+record_class_cache_max_size = 256
+
+
+
+
+class SlotsRecord(object):
+    '''
+    Base class for record classes generated with `record_type='slots'` or
+    `record_type='nested'`.  Like a namedtuple, a record has a `_fields`
+    class attribute and an `_asdict()` method, but its attributes may be
+    modified.
+    '''
+    __slots__ = ()
+    _fields: tuple[str, ...] = ()
+
+    def __repr__(self):
+        fields = ', '.join(f'{f}={getattr(self, f)!r}' for f in self._fields)
+        return f'{self.__class__.__name__}({fields})'
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self._fields)
+
+    __hash__ = None  # type: ignore
+
+    def _asdict(self) -> dict[str, Any]:
+        return {f: getattr(self, f) for f in self._fields}
+
+
+def _slots_record_class(name: str, fields: tuple[str, ...]) -> type[SlotsRecord]:
+    # `__init__()` is generated so that records are created as quickly as
+    # namedtuples.  Fields missing from data default to `None`.  Field names
+    # never start with an underscore, so the receiver is named `_self` to
+    # allow a field named `self`.
+    params = ''.join(f', {f}=None' for f in fields)
+    body = ''.join(f'\n    _self.{f} = {f}' for f in fields) or '\n    pass'
+    source = f'def __init__(_self{params}):{body}'
+    namespace: dict[str, Any] = {}
+    exec(compile(source, f'<latex2pydata record {name}>', 'exec'), namespace)
+    return type(name, (SlotsRecord,), {
+        '__slots__': fields,
+        '__init__': namespace['__init__'],
+        '__module__': __name__,
+        '_fields': fields,
+    })
+
+
+
+
+class RecordSpec(NamedTuple):
+    '''
+    Structure of a record class generated from schema keys.  `children` maps
+    each field that holds the values for key paths to the `RecordSpec` for
+    that subtree, and other fields to `None`.  With `record_type='slots'`,
+    subtrees are ordinary dicts, with `cls` set to `dict`.
+    '''
+    cls: type
+    fields: tuple[str, ...]
+    children: dict[str, 'RecordSpec | None']
+
+
+def _make_record_spec(cache_key: tuple[RecordType, tuple[str, ...]]) -> RecordSpec:
+    record_type, keys = cache_key
+    root: dict[str, Any] = {}
+    for k in keys:
+        keypath = k.split('.')
+        for kp_elem in keypath:
+            if keyword.iskeyword(kp_elem) or kp_elem.startswith('_'):
+                raise Latex2PydataSchemaError(
+                    f'Schema key "{k}" cannot be used as a field name with record_type "{record_type}"'
+                )
+        node = root
+        for kp_elem in keypath[:-1]:
+            node = node.setdefault(kp_elem, {})
+            if node is None:
+                break
+        if node is None or keypath[-1] in node:
+            raise Latex2PydataSchemaError(
+                f'Schema key "{k}" conflicts with another key path, which is not supported with '
+                f'record_type "{record_type}"'
+            )
+        node[keypath[-1]] = None
+
+    def make_spec(name: str, node: dict[str, Any], top: bool) -> RecordSpec:
+        fields = tuple(node)
+        children = {f: None if v is None else make_spec(f'{name}_{f}', v, False) for f, v in node.items()}
+        if record_type == 'slots' and not top:
+            cls = dict
+        elif record_type == 'namedtuple':
+            cls = collections.namedtuple(name, fields, defaults=(None,)*len(fields), module=__name__)
+        else:
+            cls = _slots_record_class(name, fields)
+        return RecordSpec(cls, fields, children)
+
+    return make_spec('Record', root, True)
+
+
+_record_spec_cache = LRUCache(_make_record_spec, record_class_cache_max_size)
+
+
+def record_spec(schema: CompiledSchema, record_type: RecordType) -> RecordSpec:
+    '''
+    Get the `RecordSpec` for a schema.  Record classes are generated from
+    the schema keys, with fields in schema order, and are cached, so all
+    schemas with the same keys in the same order use the same classes.
+    '''
+    if record_type not in record_types or record_type == 'dict':
+        raise ValueError(f'Invalid record_type "{record_type}"')
+    if not schema.entries:
+        raise TypeError(f'record_type "{record_type}" requires a schema')
+    return _record_spec_cache[(record_type, tuple(schema.entries))]
+
+
+def record_builder(spec: RecordSpec, keys: tuple[str, ...]) -> Callable[[list[Any]], Any]:
+    '''
+    Generate a function that creates a record from a list of decoded values
+    for `keys`, in the same order as `keys`.
+    '''
+    indices = {k: index for index, k in enumerate(keys)}
+    prefixes = {'.'.join(k.split('.')[:n]) for k in keys for n in range(1, k.count('.') + 1)}
+    unused = set(keys)
+    namespace: dict[str, Any] = {}
+
+    def expr(spec: RecordSpec, prefix: str) -> str:
+        args = []
+        for f in spec.fields:
+            key = prefix + f
+            child = spec.children[f]
+            if child is None:
+                if key in indices:
+                    unused.discard(key)
+                    args.append((f, f'v[{indices[key]}]'))
+                else:
+                    args.append((f, 'None'))
+            elif key in prefixes:
+                args.append((f, expr(child, key + '.')))
+            else:
+                args.append((f, 'None'))
+        if spec.cls is dict:
+            return '{' + ', '.join(f'{f!r}: {e}' for f, e in args if e != 'None') + '}'
+        cls_name = f'C{len(namespace)}'
+        namespace[cls_name] = spec.cls
+        return f'{cls_name}(' + ', '.join(e for _, e in args) + ')'
+
+    body = expr(spec, '')
+    if unused:
+        k = sorted(unused, key=indices.__getitem__)[0]
+        raise Latex2PydataInvalidDataError(f'Key "{k}" is not in the schema, so it cannot be stored in a record')
+    exec(compile(f'def build(v):\n    return {body}', '<latex2pydata record builder>', 'exec'), namespace)
+    return namespace['build']
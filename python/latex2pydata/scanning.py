@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import ast
+import mmap
+import re
+from typing import Any, Callable, Iterator
+from .err import Latex2PydataInvalidDataError
+
+
+
+
+key_pattern = r'[A-Za-z_][0-9A-Za-z_]*'
+keypath_pattern = rf'{key_pattern}(?:\.{key_pattern})*'
+keypath_re = re.compile(keypath_pattern)
+
+# Python string literals.  Prefixes are accepted here so that record
+# boundaries are found correctly; whether a prefix is actually valid is
+# checked when the string is decoded.  An opening triple quote that is not
+# closed must never be reinterpreted as an empty string followed by a quote,
+# since that would allow a `}` inside a partially read multiline value to be
+# mistaken for the end of a record.
+string_prefix_pattern = r'[rRuUbBfF]{0,2}'
+string_body_patterns = {
+    '"""': r'"""[^"\\]*(?:(?:\\(?:\r\n|.)|"(?!""))[^"\\]*)*"""',
+    "'''": r"'''[^'\\]*(?:(?:\\(?:\r\n|.)|'(?!''))[^'\\]*)*'''",
+    '"': r'"(?!"")[^"\\\n]*(?:\\(?:\r\n|.)[^"\\\n]*)*"',
+    "'": r"'(?!'')[^'\\\n]*(?:\\(?:\r\n|.)[^'\\\n]*)*'",
+}
+string_pattern = rf'''{string_prefix_pattern}(?:{'|'.join(string_body_patterns.values())})'''
+unterminated_string_pattern = rf'''{string_prefix_pattern}(?:"""|\'\'\'|"|')'''
+# Comments always extend to the end of the line, so that regex backtracking
+# can never treat part of a comment as data.  A backslash line continuation
+# counts as whitespace, as it does in Python.
+comment_pattern = r'\#[^\n]*(?![^\n])'
+whitespace_or_comment_pattern = rf'(?:[ \t\f\r\n]+|\\(?:\r\n|\r|\n)|{comment_pattern})*'
+
+record_token_pattern = (
+    rf'''(?P<string>{string_pattern})|(?P<unterminated>{unterminated_string_pattern})|'''
+    rf'''(?P<comment>{comment_pattern})|(?P<open>[\[{{(])|(?P<close>[\]}})])'''
+)
+# A complete `"key": "value",` pair in the form written by the LaTeX package.
+# Anything else (implicit string concatenation, a missing separator, data
+# that ends mid-pair, invalid data) is handled by the general parser.  Valid
+# literals that the general parser does not accept either (for example,
+# parenthesized strings) are evaluated with `ast.literal_eval()`.
+key_value_pair_pattern = (
+    rf'''{whitespace_or_comment_pattern}(?:"(?P<key>{keypath_pattern})"|(?P<key_string>{string_pattern}))'''
+    rf'''{whitespace_or_comment_pattern}:{whitespace_or_comment_pattern}(?P<value>{string_pattern})'''
+    rf'''{whitespace_or_comment_pattern}(?P<sep>[,}}])'''
+)
+non_latin_1_escape_re = re.compile(r'\\[^\x00-\xff]')
+
+default_chunk_size = 2**16
+
+raw_data_type_error_message = (
+    'Before any schema is applied, data must be dict[str, str] or list[dict[str, str]]'
+)
+
+
+
+
+def check_raw_data_dict(obj: Any):
+    '''
+    Check that an evaluated record is a `dict[str, str]` with keys that match
+    `keypath_re`.
+    '''
+    if not isinstance(obj, dict):
+        raise Latex2PydataInvalidDataError(raw_data_type_error_message)
+    for k, v in obj.items():
+        if not isinstance(k, str) or not isinstance(v, str):
+            raise Latex2PydataInvalidDataError(raw_data_type_error_message)
+        if not keypath_re.fullmatch(k):
+            raise Latex2PydataInvalidDataError(f'Unsupported key name "{k}"')
+
+
+
+
+class IncompleteDataError(Exception):
+    '''
+    Data ended before the current record was complete.  More data may make
+    the record valid.
+    '''
+    pass
+
+
+
+
+def decode_string(token: str) -> str:
+    '''
+    Decode a single Python string literal, as matched by `string_re`.
+
+    Escape sequences are processed with the `unicode_escape` codec, which
+    follows Python string literal rules.  The rare case that the codec cannot
+    represent exactly (an escape that is immediately followed by a character
+    outside Latin-1) falls back to `ast.literal_eval()`.
+    '''
+    quote_index = 0
+    while token[quote_index] not in ('"', "'"):
+        quote_index += 1
+    prefix = token[:quote_index].lower()
+    if prefix not in ('', 'r', 'u'):
+        if 'b' in prefix or 'f' in prefix:
+            raise Latex2PydataInvalidDataError(raw_data_type_error_message)
+        raise Latex2PydataInvalidDataError(f'Loading data failed:\ninvalid string prefix in {token}')
+    if token.startswith(('"""', "'''"), quote_index):
+        body = token[quote_index+3:-3]
+    else:
+        body = token[quote_index+1:-1]
+    if '\r' in body:
+        body = body.replace('\r\n', '\n').replace('\r', '\n')
+    if prefix == 'r' or '\\' not in body:
+        return body
+    try:
+        if body.isascii():
+            return body.encode('ascii').decode('unicode_escape')
+        if not non_latin_1_escape_re.search(body):
+            return body.encode('latin-1', 'backslashreplace').decode('unicode_escape')
+        return ast.literal_eval(token)
+    except Exception as e:
+        raise Latex2PydataInvalidDataError(f'Loading data failed:\n{e}')
+
+
+class Syntax(object):
+    '''
+    Compiled regular expressions and parsing functions for data in a `str`,
+    or for UTF-8 data in a bytes-like object (`bytes`, `bytearray`,
+    `memoryview`, `mmap.mmap`).
+
+    For bytes-like data, only individual strings are decoded as they are
+    extracted, so the data as a whole is never copied or decoded.
+    '''
+    def __init__(self, data_type: type):
+        self.is_bytes: bool = data_type is not str
+        if self.is_bytes:
+            def compile(pattern: str, flags: int = 0) -> re.Pattern:
+                return re.compile(pattern.encode('ascii'), flags)
+            def token(char: str) -> bytes:
+                return char.encode('ascii')
+        else:
+            compile = re.compile
+            def token(char: str) -> str:
+                return char
+        self.string_re = compile(string_pattern, re.DOTALL)
+        self.unterminated_string_re = compile(rf'{unterminated_string_pattern}|{string_prefix_pattern}\Z')
+        self.whitespace_or_comment_re = compile(whitespace_or_comment_pattern)
+        self.record_token_re = compile(record_token_pattern, re.DOTALL)
+        self.key_value_pair_re = compile(key_value_pair_pattern, re.DOTALL)
+        self.empty = token('')
+        self.open_list = token('[')
+        self.close_list = token(']')
+        self.open_dict = token('{')
+        self.close_dict = token('}')
+        self.comma = token(',')
+        self.colon = token(':')
+        self.backslash = token('\\')
+
+    def to_str(self, data) -> str:
+        '''
+        Convert a slice of data into a `str`.
+        '''
+        if not self.is_bytes:
+            return data
+        try:
+            return bytes(data).decode('utf8')
+        except UnicodeDecodeError as e:
+            raise Latex2PydataInvalidDataError(f'Loading data failed:\n{e}')
+
+    def decode_string(self, token) -> str:
+        '''
+        Decode a single Python string literal, as matched by `string_re`.
+        '''
+        if not self.is_bytes:
+            return decode_string(token)
+        return decode_string(self.to_str(token))
+
+    def ends_with_line_continuation(self, string, pos: int) -> bool:
+        '''
+        Whether the data from `pos` is only a backslash, which may be the
+        start of a line continuation that has not been read yet.
+        '''
+        return string[pos:pos+2] == self.backslash
+
+    def _skip_whitespace(self, string, pos: int) -> int:
+        pos = self.whitespace_or_comment_re.match(string, pos).end()
+        if pos >= len(string) or self.ends_with_line_continuation(string, pos):
+            raise IncompleteDataError
+        return pos
+
+    def _parse_string(self, string, pos: int) -> tuple[str, int]:
+        # Parse one or more adjacent string literals (implicit concatenation)
+        # starting at or after `pos`
+        parts = []
+        pos = self._skip_whitespace(string, pos)
+        while True:
+            match = self.string_re.match(string, pos)
+            if match is None:
+                if self.unterminated_string_re.match(string, pos):
+                    raise IncompleteDataError
+                if parts:
+                    break
+                raise Latex2PydataInvalidDataError(raw_data_type_error_message)
+            parts.append(self.decode_string(match.group()))
+            pos = self._skip_whitespace(string, match.end())
+        if len(parts) == 1:
+            return (parts[0], pos)
+        return (''.join(parts), pos)
+
+    def parse_raw_data_dict(self, string, pos: int) -> tuple[dict[str, str], int]:
+        '''
+        Parse a `dict[str, str]` beginning with the `{` at `pos`.  Return the
+        dict and the position after the closing `}`.
+
+        Keys are checked against `keypath_re` as they are extracted.  Raise
+        `IncompleteDataError` if the data ends before the dict is complete.
+        A record that the scanner does not accept is evaluated with
+        `ast.literal_eval()`, so that any valid literal gives the same result
+        as with `parser='literal_eval'`.  If that fails as well, the
+        scanner's error is raised.
+        '''
+        try:
+            return self._scan_raw_data_dict(string, pos)
+        except Latex2PydataInvalidDataError as e:
+            scan_error = e
+        end = self.find_record_end(string, pos)
+        try:
+            raw_data_dict = ast.literal_eval(self.to_str(string[pos:end]))
+            evaluated = True
+        except Exception:
+            evaluated = False
+        if not evaluated:
+            raise scan_error
+        check_raw_data_dict(raw_data_dict)
+        return (raw_data_dict, end)
+
+    def _scan_raw_data_dict(self, string, pos: int) -> tuple[dict[str, str], int]:
+        key_value_pair_match = self.key_value_pair_re.match
+        decode_string = self.decode_string
+        is_bytes = self.is_bytes
+        close_dict = self.close_dict
+        raw_data_dict = {}
+        pos += 1
+        while True:
+            match = key_value_pair_match(string, pos)
+            if match is not None:
+                key = match.group('key')
+                if key is None:
+                    key = decode_string(match.group('key_string'))
+                    if not keypath_re.fullmatch(key):
+                        raise Latex2PydataInvalidDataError(f'Unsupported key name "{key}"')
+                elif is_bytes:
+                    key = key.decode('ascii')
+                raw_data_dict[key] = decode_string(match.group('value'))
+                pos = match.end()
+                if match.group('sep') == close_dict:
+                    return (raw_data_dict, pos)
+                continue
+            pos = self._skip_whitespace(string, pos)
+            if string[pos:pos+1] == close_dict:
+                return (raw_data_dict, pos + 1)
+            key, pos = self._parse_string(string, pos)
+            if string[pos:pos+1] != self.colon:
+                raise Latex2PydataInvalidDataError(
+                    f'Loading data failed:\nexpected ":" after key "{key}", but found "{self.excerpt(string, pos)}"'
+                )
+            if not keypath_re.fullmatch(key):
+                raise Latex2PydataInvalidDataError(f'Unsupported key name "{key}"')
+            value, pos = self._parse_string(string, pos + 1)
+            raw_data_dict[key] = value
+            if string[pos:pos+1] == close_dict:
+                return (raw_data_dict, pos + 1)
+            if string[pos:pos+1] != self.comma:
+                raise Latex2PydataInvalidDataError(
+                    f'Loading data failed:\nexpected "," or "}}" after value for key "{key}", '
+                    f'but found "{self.excerpt(string, pos)}"'
+                )
+            pos += 1
+
+    def find_record_end(self, string, pos: int) -> int:
+        '''
+        Starting from a `{` at `pos`, find the position just after the
+        matching `}` without evaluating anything in between.  Raise
+        `IncompleteDataError` if the data ends first.
+        '''
+        depth = 0
+        for match in self.record_token_re.finditer(string, pos):
+            kind = match.lastgroup
+            if kind == 'open':
+                depth += 1
+            elif kind == 'close':
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+            elif kind == 'unterminated':
+                break
+        raise IncompleteDataError
+
+    def parse_record_string(self, string, pos: int) -> tuple[str, int]:
+        '''
+        Return the source text of the record beginning with the `{` at `pos`,
+        and the position after its closing `}`.
+        '''
+        end = self.find_record_end(string, pos)
+        return (self.to_str(string[pos:end]), end)
+
+    def excerpt(self, string, pos: int) -> str:
+        excerpt = string[pos:pos+20]
+        if self.is_bytes:
+            return bytes(excerpt).decode('utf8', 'replace')
+        return excerpt
+
+
+str_syntax = Syntax(str)
+bytes_syntax = Syntax(bytes)
+
+parse_raw_data_dict = str_syntax.parse_raw_data_dict
+find_record_end = str_syntax.find_record_end
+parse_record_string = str_syntax.parse_record_string
+
+
+
+
+class RecordScanner(object):
+    '''
+    Split a latex2pydata document into its top-level records (dicts).
+
+    Data is taken from an initial `str` or bytes-like object (UTF-8), plus an
+    optional `read()` function that returns additional data of the same type
+    in chunks.  Data that has already been returned as part of a record is
+    discarded, so memory use is proportional to the largest record rather
+    than to the whole document.  Scanning begins at `pos`.
+    '''
+    def __init__(self, string: str | bytes | bytearray | memoryview | mmap.mmap = '',
+                 read: Callable[[int], str | bytes] | None = None,
+                 chunk_size: int = default_chunk_size,
+                 pos: int = 0):
+        self._syntax: Syntax = str_syntax if isinstance(string, str) else bytes_syntax
+        self._buffer = string
+        self._pos: int = pos
+        self._read: Callable[[int], str | bytes] | None = read
+        self._chunk_size: int = chunk_size
+        self.top_is_list: bool | None = None
+
+    def _fill(self) -> bool:
+        '''
+        Append another chunk of data to the buffer, discarding data that has
+        already been consumed.  Return `False` at end of data.
+        '''
+        if self._read is None:
+            return False
+        # Read at least as much as the unconsumed data, so that when a single
+        # record spans many reads the buffer doubles each time and rescanning
+        # from the start of the record remains linear overall.  Otherwise,
+        # reads stay at `chunk_size`.
+        chunk = self._read(max(self._chunk_size, len(self._buffer) - self._pos))
+        if not chunk:
+            self._read = None
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            match = self._syntax.whitespace_or_comment_re.match(self._buffer, self._pos)
+            self._pos = match.end()
+            if ((self._pos < len(self._buffer) and
+                    not self._syntax.ends_with_line_continuation(self._buffer, self._pos)) or
+                    not self._fill()):
+                return
+
+    def _peek(self):
+        self._skip_whitespace()
+        return self._buffer[self._pos:self._pos+1]
+
+    def read_remaining(self) -> str:
+        '''
+        Return all data that has not yet been consumed, as a `str`.
+        '''
+        while self._fill():
+            pass
+        remaining = self._syntax.to_str(self._buffer[self._pos:])
+        self._pos = len(self._buffer)
+        return remaining
+
+    def _unexpected(self, expected: str) -> Latex2PydataInvalidDataError:
+        found = self._syntax.excerpt(self._buffer, self._pos)
+        if found:
+            found = f'"{found}"'
+        else:
+            found = 'end of data'
+        return Latex2PydataInvalidDataError(f'Loading data failed:\nexpected {expected}, but found {found}')
+
+    def start(self) -> bool:
+        '''
+        Determine whether the top-level data is a list or a dict.  Return
+        `False` if the data does not begin with a list or a dict, in which
+        case the data should be processed with `read_remaining()`.
+        '''
+        char = self._peek()
+        if char == self._syntax.open_list:
+            self._pos += 1
+            self.top_is_list = True
+            return True
+        if char == self._syntax.open_dict:
+            self.top_is_list = False
+            return True
+        return False
+
+    def _next_record(self, parse: Callable[[Any, int], tuple[Any, int]]) -> Any:
+        while True:
+            try:
+                record, end = parse(self._buffer, self._pos)
+            except IncompleteDataError:
+                if not self._fill():
+                    raise Latex2PydataInvalidDataError(
+                        'Loading data failed:\nunexpected end of data within a dict (unclosed "{" or string)'
+                    )
+            else:
+                self._pos = end
+                return record
+
+    def _iter(self, parse: Callable[[Any, int], tuple[Any, int]]) -> Iterator[Any]:
+        if self.top_is_list is None:
+            raise TypeError('Must call start() before iterating over records')
+        syntax = self._syntax
+        if not self.top_is_list:
+            record = self._next_record(parse)
+            if self._peek():
+                raise self._unexpected('end of data after dict')
+            yield record
+            return
+        while True:
+            char = self._peek()
+            if char == syntax.close_list:
+                self._pos += 1
+                break
+            if char != syntax.open_dict:
+                if char in (syntax.empty, syntax.comma):
+                    raise self._unexpected('dict or "]"')
+                raise Latex2PydataInvalidDataError(raw_data_type_error_message)
+            yield self._next_record(parse)
+            char = self._peek()
+            if char == syntax.comma:
+                self._pos += 1
+            elif char != syntax.close_list:
+                raise self._unexpected('"," or "]"')
+        if self._peek():
+            raise self._unexpected('end of data after list')
+
+    def iter_raw_data_dicts(self) -> Iterator[dict[str, str]]:
+        '''
+        Iterate over the top-level records, parsed as `dict[str, str]` with
+        keys checked against `keypath_re`.
+        '''
+        return self._iter(self._syntax.parse_raw_data_dict)
+
+    def iter_record_strings(self) -> Iterator[str]:
+        '''
+        Iterate over the source text of the top-level records, without
+        evaluating them.
+        '''
+        return self._iter(self._syntax.parse_record_string)
+
+    def iter_record_spans(self) -> Iterator[tuple[int, int]]:
+        '''
+        Iterate over the positions `(<start>, <end>)` of the top-level records
+        in the data, without evaluating them.  Positions are only meaningful
+        for data that is not read in chunks.
+        '''
+        find_record_end = self._syntax.find_record_end
+        def parse(string, pos: int) -> tuple[tuple[int, int], int]:
+            end = find_record_end(string, pos)
+            return ((pos, end), end)
+        return self._iter(parse)
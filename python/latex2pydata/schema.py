@@ -10,11 +10,15 @@
 
 from __future__ import annotations
 
-import itertools
+import ast
+import functools
+import hashlib
 import re
-from typing import Callable, Type
-from .err import Latex2PydataSchemaError
-from .util import KeyDefaultDict
+import types
+from typing import Any, Callable, Literal, Mapping, NamedTuple, Type, Union
+from .err import Latex2PydataInvalidMetadataError, Latex2PydataSchemaError, Latex2PydataInvalidDataError
+from .scanning import decode_string, keypath_re, string_body_patterns
+from .util import LRUCache
 
 
 
@@ -43,70 +47,472 @@ annot_collections: dict[str, Type] = {
     **annot_sets,
     **annot_mappings,
 }
-annot_any_single_scalar_pattern = '|'.join(k for k in annot_scalars)
-annot_any_scalar_pattern = rf'(?:{annot_any_single_scalar_pattern})(?:\|(?:{annot_any_single_scalar_pattern}))*'
-annot_any_sequence_name_pattern = '|'.join(k for k in annot_sequences)
-annot_any_sequence_or_set_name_pattern = '|'.join(k for k in itertools.chain(annot_sets, annot_sequences))
-annot_any_mapping_name_pattern = '|'.join(k for k in annot_mappings)
-annot_any_scalar_collection_pattern = '|'.join([
-    rf'(?:{annot_any_sequence_or_set_name_pattern})\[{annot_any_scalar_pattern}\]',
-    rf'(?:{annot_any_mapping_name_pattern})\[{annot_any_scalar_pattern},{annot_any_scalar_pattern}\]',
-])
-annot_any_nested_collection_pattern = '|'.join([
-    rf'(?:{annot_any_sequence_name_pattern})\[(?:{annot_any_scalar_collection_pattern})\]',
-    rf'(?:{annot_any_mapping_name_pattern})\[{annot_any_scalar_pattern},(?:{annot_any_scalar_collection_pattern})\]',
-])
-annot_any_pattern = '|'.join([
-    annot_any_scalar_pattern,
-    annot_any_scalar_collection_pattern,
-    annot_any_nested_collection_pattern,
-])
-annot_re = re.compile(annot_any_pattern)
-
-
-
-
-def validator_factory(annot: str) -> Callable[[str], bool]:
+# Maximum number of parsed annotations, validators, and decoders that are
+# cached.  Each distinct annotation has its own entry.
+annot_cache_max_size = 1024
+
+
+
+
+class AnnotScalar(NamedTuple):
+    '''
+    Scalar type annotation, or a union of scalars.  Names are sorted and
+    unique.
+    '''
+    names: tuple[str, ...]
+
+    def __str__(self):
+        return '|'.join(self.names)
+
+
+class AnnotCollection(NamedTuple):
+    '''
+    Collection type annotation:  `list[<arg>]`, `set[<arg>]`,
+    `dict[<key arg>, <value arg>]`, `tuple[<arg>, ...]` (`variadic`), or
+    `tuple[<arg>, <arg>, ...]` with a fixed number of arguments.
+    '''
+    name: str
+    args: tuple[Annot, ...]
+    variadic: bool = False
+
+    def __str__(self):
+        args = ','.join(str(arg) for arg in self.args)
+        if self.variadic:
+            args += ',...'
+        return f'{self.name}[{args}]'
+
+
+Annot = Union[AnnotScalar, AnnotCollection]
+
+
+annot_token_re = re.compile(r'\s*(?:(?P<name>[A-Za-z_][A-Za-z0-9_]*)|(?P<punct>\.\.\.|[\[\],|])|(?P<end>\Z))')
+
+
+class _AnnotParser(object):
+    '''
+    Recursive descent parser for type annotations.
+    '''
+    def __init__(self, annot: str):
+        self.annot: str = annot
+        self.pos: int = 0
+        self.token: str = ''
+        self.next()
+
+    def error(self, message: str) -> Latex2PydataSchemaError:
+        return Latex2PydataSchemaError(f'Invalid or unsupported schema value (type annotation) "{self.annot}":\n{message}')
+
+    def next(self) -> str:
+        # Advance to the next token, and return the previous token.  The
+        # token at end of data is the empty string.
+        token = self.token
+        match = annot_token_re.match(self.annot, self.pos)
+        if match is None:
+            raise self.error(f'unexpected "{self.annot[self.pos:].strip()}"')
+        self.pos = match.end()
+        self.token = match.group('name') or match.group('punct') or ''
+        return token
+
+    def expect(self, token: str):
+        if self.token != token:
+            raise self.error(f'expected "{token}" but found "{self.token}"' if self.token else f'expected "{token}"')
+        self.next()
+
+    def parse(self) -> Annot:
+        annot = self.union()
+        if self.token:
+            raise self.error(f'unexpected "{self.token}"')
+        return annot
+
+    def union(self) -> Annot:
+        members = [self.term()]
+        while self.token == '|':
+            self.next()
+            members.append(self.term())
+        if len(members) == 1:
+            return members[0]
+        if any(isinstance(member, AnnotCollection) for member in members):
+            raise self.error('unions of collection types are not supported')
+        return AnnotScalar(tuple(sorted(set(name for member in members for name in member.names))))
+
+    def term(self) -> Annot:
+        name = self.next()
+        if name not in annot_scalars and name not in annot_collections:
+            if not name:
+                raise self.error('missing type')
+            if not name.isidentifier():
+                raise self.error(f'expected type but found "{name}"')
+            raise self.error(f'unknown type "{name}"')
+        if self.token != '[':
+            if name not in annot_scalars:
+                raise self.error(f'collection type "{name}" requires a subscript')
+            return AnnotScalar((name,))
+        if name not in annot_collections and name != 'tuple':
+            raise self.error(f'type "{name}" cannot be subscripted')
+        self.next()
+        args = [self.union()]
+        variadic = False
+        while self.token == ',':
+            self.next()
+            if self.token == '...':
+                if name != 'tuple' or len(args) != 1:
+                    raise self.error('"..." is only supported as the second argument of "tuple[]"')
+                self.next()
+                variadic = True
+                break
+            args.append(self.union())
+        self.expect(']')
+        if name in annot_mappings:
+            if len(args) != 2:
+                raise self.error(f'"{name}[]" requires 2 arguments')
+        elif name != 'tuple' and len(args) != 1:
+            raise self.error(f'"{name}[]" requires 1 argument')
+        return AnnotCollection(name, tuple(args), variadic)
+
+
+def _parse_annot(annot: str) -> Annot:
+    return _AnnotParser(annot).parse()
+
+# Parsed annotations are cached by annotation string, so that checking an
+# annotation is a dictionary lookup after it has first been parsed
+annot_tree_dict = LRUCache(_parse_annot, annot_cache_max_size)
+
+def parse_annot(annot: str) -> Annot:
+    '''
+    Parse a type annotation into a tree of `AnnotScalar` and
+    `AnnotCollection`.  Raise `Latex2PydataSchemaError` for invalid or
+    unsupported annotations.  Results are cached.
+    '''
+    return annot_tree_dict[annot]
+
+
+def normalize_annot(annot: str) -> str:
+    '''
+    Normalize a type annotation so that equivalent annotations are identical:
+    remove whitespace, and sort and deduplicate union members at each level.
+    '''
+    if annot == 'verbatim':
+        return annot
+    return str(parse_annot(annot))
+
+
+
+
+def validator_factory(annot: str) -> Callable[[Any], bool]:
     # This only deals with native Python type annotations.  The special
     # `verbatim` type annotation defined by latex2pydata is handled separately
     # during data loading.
-    if '[' not in annot:
+    #
+    # Each annotation is compiled into a single function with a loop for each
+    # level of collection nesting, so that validating a collection does not
+    # involve a function call per element.  Generated code only contains
+    # names created here; types are passed in as default argument values.
+    types_by_name: dict[Any, str] = {}
+    lines: list[str] = []
+    _validator_lines(parse_annot(annot), 'x', 1, lines, types_by_name)
+    args = ''.join(f', {name}={name}' for name in types_by_name.values())
+    source = '\n'.join([f'def validate(x, isinstance=isinstance, len=len{args}):', *lines, '    return True'])
+    namespace: dict[str, Any] = {name: t for t, name in types_by_name.items()}
+    exec(compile(source, '<latex2pydata validator>', 'exec'), namespace)
+    validate = namespace['validate']
+    validate.source = source
+    return validate
+
+def _validator_lines(annot: Annot, var: str, depth: int, lines: list[str], types_by_name: dict[Any, str]):
+    # Append lines of code that return `False` if `var` does not match
+    # `annot`.  Nothing is appended if any value matches.
+    indent = '    ' * depth
+    def type_name(t: Any) -> str:
         try:
-            scalar_types = [annot_scalars[s] for s in annot.split('|')]
+            return types_by_name[t]
         except KeyError:
-            raise Latex2PydataSchemaError(f'Invalid or unsupported schema scalar type "{annot}"')
-        if len(scalar_types) == 1:
-            scalar_type = scalar_types[0]
-            return lambda x: isinstance(x, scalar_type)
-        scalar_types = tuple(scalar_types)
-        return lambda x: any(isinstance(x, t) for t in scalar_types)
-    collection_name, collection_arg = annot.split('[', 1)
+            name = f'T{len(types_by_name)}'
+            types_by_name[t] = name
+            return name
+    if isinstance(annot, AnnotScalar):
+        scalar_types = tuple(annot_scalars[name] for name in annot.names)
+        if object in scalar_types:
+            return
+        lines.append(f'{indent}if not isinstance({var}, {type_name(scalar_types[0] if len(scalar_types) == 1 else scalar_types)}):')
+        lines.append(f'{indent}    return False')
+        return
+    collection_type = tuple if annot.name == 'tuple' else annot_collections[annot.name]
+    lines.append(f'{indent}if not isinstance({var}, {type_name(collection_type)}):')
+    lines.append(f'{indent}    return False')
+    sub_lines: list[str] = []
+    if annot.name in annot_mappings:
+        key_var = f'k{depth}'
+        value_var = f'v{depth}'
+        _validator_lines(annot.args[0], key_var, depth + 1, sub_lines, types_by_name)
+        _validator_lines(annot.args[1], value_var, depth + 1, sub_lines, types_by_name)
+        if sub_lines:
+            lines.append(f'{indent}for {key_var}, {value_var} in {var}.items():')
+            lines.extend(sub_lines)
+        return
+    if annot.name == 'tuple' and not annot.variadic:
+        lines.append(f'{indent}if len({var}) != {len(annot.args)}:')
+        lines.append(f'{indent}    return False')
+        for index, arg in enumerate(annot.args):
+            _validator_lines(arg, f'{var}[{index}]', depth, lines, types_by_name)
+        return
+    elem_var = f'x{depth}'
+    _validator_lines(annot.args[0], elem_var, depth + 1, sub_lines, types_by_name)
+    if sub_lines:
+        lines.append(f'{indent}for {elem_var} in {var}:')
+        lines.extend(sub_lines)
+
+validator_dict = LRUCache(validator_factory, annot_cache_max_size, normalize_annot)
+
+
+
+
+SchemaMissing = Literal['error', 'verbatim', 'evalany']
+Decoder = Callable[[str, str], Any]
+
+
+def decode_verbatim(key: str, raw_value: str) -> str:
+    return raw_value
+
+
+def decode_evalany(key: str, raw_value: str) -> Any:
     try:
-        collection_type = annot_collections[collection_name]
-    except KeyError:
-        raise Latex2PydataSchemaError(f'Invalid or unsupported schema collection type "{collection_name}"')
-    if collection_arg.endswith(']'):
-        collection_arg = collection_arg[:-1]
-    else:
-        raise Latex2PydataSchemaError(f'Invalid or unsupported schema type "{annot}"')
-    if collection_name not in annot_mappings:
-        sub_validate = validator_dict[collection_arg]
-        def validate(x):
-            if not isinstance(x, collection_type):
-                return False
-            if not all(sub_validate(x_n) for x_n in x):
-                return False
-            return True
-        return validate
-    key_arg, value_arg = collection_arg.split(',', 1)
-    key_validate = validator_dict[key_arg]
-    value_validate = validator_dict[value_arg]
-    def validate(x):
-        if not isinstance(x, collection_type):
-            return False
-        if not all(key_validate(k) and value_validate(v) for k, v in x.items()):
-            return False
+        return ast.literal_eval(raw_value)
+    except Exception as e:
+        raise Latex2PydataInvalidDataError(f'Invalid value for key "{key}":\n{e}')
+
+
+def decode_missing_error(key: str, raw_value: str):
+    raise Latex2PydataInvalidDataError(f'Key "{key}" is missing a schema entry')
+
+
+missing_decoders: dict[str, Decoder] = {
+    'error': decode_missing_error,
+    'verbatim': decode_verbatim,
+    'evalany': decode_evalany,
+}
+
+
+# Exact literal syntax for common scalar types.  Values that match are
+# converted directly.  Anything else, including valid but less common literal
+# forms like hexadecimal integers or parenthesized values, falls back to
+# `ast.literal_eval()`, so results are always identical.
+digit_part_pattern = r'[0-9](?:_?[0-9])*'
+exponent_pattern = rf'[eE][+-]?{digit_part_pattern}'
+int_literal_re = re.compile(r'[+-]?(?:[1-9](?:_?[0-9])*|0(?:_?0)*)')
+float_literal_re = re.compile(
+    rf'''[+-]?(?:(?:{digit_part_pattern})?\.{digit_part_pattern}(?:{exponent_pattern})?|'''
+    rf'''{digit_part_pattern}\.(?:{exponent_pattern})?|{digit_part_pattern}{exponent_pattern})'''
+)
+str_literal_re = re.compile(rf'''[rRuU]?(?:{'|'.join(string_body_patterns.values())})''', re.DOTALL)
+
+class _NotFast(object):
+    pass
+
+not_fast = _NotFast()
+
+
+def _fast_decode_int(raw_value: str) -> int | _NotFast:
+    if int_literal_re.fullmatch(raw_value):
+        try:
+            return int(raw_value)
+        except ValueError:
+            # Exceeds integer string conversion length limit
+            pass
+    return not_fast
+
+def _fast_decode_float(raw_value: str) -> float | _NotFast:
+    if float_literal_re.fullmatch(raw_value):
+        return float(raw_value)
+    return not_fast
+
+def _fast_decode_bool(raw_value: str) -> bool | _NotFast:
+    if raw_value == 'True':
         return True
-    return validate
+    if raw_value == 'False':
+        return False
+    return not_fast
+
+def _fast_decode_none(raw_value: str) -> None | _NotFast:
+    if raw_value == 'None':
+        return None
+    return not_fast
+
+def _fast_decode_str(raw_value: str) -> str | _NotFast:
+    # A raw carriage return is only valid within a triple-quoted string, and a
+    # null character is never valid, so these are left to `ast.literal_eval()`
+    if '\r' in raw_value or '\x00' in raw_value:
+        return not_fast
+    if str_literal_re.fullmatch(raw_value):
+        try:
+            return decode_string(raw_value)
+        except Latex2PydataInvalidDataError:
+            pass
+    return not_fast
+
+fast_scalar_decoders: dict[str, Callable[[str], Any]] = {
+    'bool': _fast_decode_bool,
+    'float': _fast_decode_float,
+    'int': _fast_decode_int,
+    'None': _fast_decode_none,
+    'str': _fast_decode_str,
+}
+
+
+def decoder_factory(annot: str) -> Decoder:
+    '''
+    Create a function that takes a key and a raw string value, and returns
+    the value after it has been evaluated and checked against the type
+    annotation `annot`.
+
+    Scalar annotations and unions of scalars use fast decoders for `bool`,
+    `float`, `int`, `None`, and `str` literals.  Other values are evaluated
+    with `ast.literal_eval()` and then validated.
+    '''
+    if annot == 'verbatim':
+        return decode_verbatim
+    validate = validator_dict[annot]
+    def decode_literal(key: str, raw_value: str) -> Any:
+        try:
+            value = ast.literal_eval(raw_value)
+        except Exception as e:
+            raise Latex2PydataInvalidDataError(f'Invalid value for key "{key}":\n{e}')
+        if not validate(value):
+            raise Latex2PydataInvalidDataError(f'Key "{key}" should have value with type "{annot}"')
+        return value
+    annot_tree = parse_annot(annot)
+    if not isinstance(annot_tree, AnnotScalar):
+        return decode_literal
+    fast_decoders = tuple(fast_scalar_decoders[s] for s in annot_tree.names if s in fast_scalar_decoders)
+    if not fast_decoders:
+        return decode_literal
+    if len(fast_decoders) == 1:
+        fast_decode = fast_decoders[0]
+        def decode(key: str, raw_value: str) -> Any:
+            value = fast_decode(raw_value)
+            if value is not_fast:
+                return decode_literal(key, raw_value)
+            return value
+        return decode
+    def decode(key: str, raw_value: str) -> Any:
+        for fast_decode in fast_decoders:
+            value = fast_decode(raw_value)
+            if value is not not_fast:
+                return value
+        return decode_literal(key, raw_value)
+    return decode
+
+# Decoders are cached by the annotation as written, since error messages
+# include it.  Equivalent annotations still share a validator.
+decoder_dict = LRUCache(decoder_factory, annot_cache_max_size)
+
+
+
+
+class SchemaEntry(NamedTuple):
+    '''
+    Everything needed to process values for a single schema key.
+    '''
+    annot: str
+    keypath: tuple[str, ...]
+    decode: Decoder
+    validate: Callable[[Any], bool] | None
+
+
+class CompiledSchema(object):
+    '''
+    A schema that has been checked and prepared for repeated use.  Create
+    instances with `compile_schema()`.
+
+    Instances are immutable, and compiling the same schema (the same keys in
+    the same order) returns the same instance.  `schema_missing` is `None` if it was not specified, in which
+    case any setting from data metadata is used during loading, with `error`
+    as the final default.
+    '''
+    __slots__ = ('schema', 'schema_missing', 'entries', 'fingerprint', '_decoders', '_missing_decoder')
+
+    schema: Mapping[str, str] | None
+    schema_missing: SchemaMissing | None
+    entries: Mapping[str, SchemaEntry]
+    fingerprint: str
+
+    def __init__(self, schema: dict[str, str] | None, schema_missing: SchemaMissing | None):
+        entries = {}
+        if schema is not None:
+            for k, v in schema.items():
+                if v == 'verbatim':
+                    validate = None
+                else:
+                    validate = validator_dict[v]
+                entries[k] = SchemaEntry(v, tuple(k.split('.')), decoder_dict[v], validate)
+            schema = types.MappingProxyType(schema)
+            missing_decoder = missing_decoders[schema_missing or 'error']
+        else:
+            # Without a schema, all values are kept verbatim
+            missing_decoder = decode_verbatim
+        set_attr = super().__setattr__
+        set_attr('schema', schema)
+        set_attr('schema_missing', schema_missing)
+        set_attr('entries', types.MappingProxyType(entries))
+        set_attr('_decoders', {k: entry.decode for k, entry in entries.items()})
+        set_attr('_missing_decoder', missing_decoder)
+        # Stable identifier for the schema settings, for use in cache keys
+        fingerprint_source = repr((None if schema is None else sorted(schema.items()), schema_missing))
+        set_attr('fingerprint', hashlib.sha256(fingerprint_source.encode('utf8')).hexdigest())
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __reduce__(self):
+        return (compile_schema, (None if self.schema is None else dict(self.schema), self.schema_missing))
+
+    def __repr__(self):
+        schema = None if self.schema is None else dict(self.schema)
+        return f'{self.__class__.__name__}({schema!r}, schema_missing={self.schema_missing!r})'
+
+    def get_decoder(self, key: str) -> Decoder:
+        '''
+        Get the decoder for a key, taking into account `schema_missing`.
+        '''
+        return self._decoders.get(key, self._missing_decoder)
+
+    def with_schema_missing(self, schema_missing: SchemaMissing | None) -> CompiledSchema:
+        if schema_missing == self.schema_missing:
+            return self
+        return compile_schema(None if self.schema is None else dict(self.schema), schema_missing)
+
+
+def compile_schema(schema: dict[str, str] | None = None,
+                   schema_missing: SchemaMissing | None = None) -> CompiledSchema:
+    '''
+    Check a schema and prepare it for repeated use.  The result may be passed
+    as the `schema` argument to any of the loading functions.
+    '''
+    if schema is not None:
+        if not isinstance(schema, dict):
+            raise Latex2PydataSchemaError('Invalid schema (must be dict[str, str])')
+        if not all(isinstance(k, str) and isinstance(v, str) for k, v in schema.items()):
+            raise Latex2PydataSchemaError('Invalid schema (must be dict[str, str])')
+        schema_items = tuple((k, v.replace(' ', '')) for k, v in schema.items())
+    else:
+        schema_items = None
+    if schema_missing == 'rawstr':
+        # Backward compatibility for < v0.5.0
+        schema_missing = 'verbatim'
+    elif schema_missing is not None and schema_missing not in ('error', 'verbatim', 'evalany'):
+        raise Latex2PydataInvalidMetadataError(f'Invalid "schema_missing" value "{schema_missing}"')
+    return _compile_schema_items(schema_items, schema_missing)
+
 
-validator_dict = KeyDefaultDict(validator_factory)
+@functools.lru_cache(maxsize=256)
+def _compile_schema_items(schema_items: tuple[tuple[str, str], ...] | None,
+                          schema_missing: SchemaMissing | None) -> CompiledSchema:
+    if schema_items is None:
+        return CompiledSchema(None, schema_missing)
+    for k, v in schema_items:
+        if not keypath_re.fullmatch(k):
+            raise Latex2PydataSchemaError(f'Invalid or unsupported schema key "{k}"')
+        if v != 'verbatim':
+            parse_annot(v)
+    return CompiledSchema(dict(schema_items), schema_missing)
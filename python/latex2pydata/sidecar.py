@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import hashlib
+import json
+import marshal
+import os
+import pathlib
+import struct
+import sys
+import tempfile
+from typing import Any, Callable
+from .version import __version__
+
+
+
+
+# Sidecar file layout:
+#
+#   * `sidecar_magic`
+#   * Header length (little-endian uint32)
+#   * Header (JSON):  format version, source hash, and settings fingerprint
+#   * Data in `marshal` format
+#
+# Loaded data only contains Python literal types (`dict`, `list`, `str`,
+# etc.), which `marshal` serializes compactly and deserializes quickly.  The
+# `marshal` format depends on the Python version, which is part of the
+# settings fingerprint.
+sidecar_magic = b'L2PYDBIN'
+sidecar_format_version = 1
+sidecar_suffix = '.bin'
+_header_length_struct = struct.Struct('<I')
+_hash_chunk_size = 2**20
+
+
+
+
+def sidecar_path(path: str | os.PathLike) -> pathlib.Path:
+    '''
+    Path of the sidecar file for a data file:  `<name>.bin` in the same
+    directory.
+    '''
+    path = pathlib.Path(path)
+    return path.with_name(path.name + sidecar_suffix)
+
+
+def content_hash(content: bytes) -> str:
+    '''
+    Hash of data file contents.
+    '''
+    return hashlib.blake2b(content, digest_size=20).hexdigest()
+
+
+def source_hash(path: str | os.PathLike) -> str:
+    '''
+    Hash of the contents of a data file, read in chunks.  This is the same as
+    `content_hash()` for the whole file.
+    '''
+    hasher = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(_hash_chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def settings_fingerprint(*settings: Any) -> str:
+    '''
+    Fingerprint of all settings that affect how data is loaded, plus the
+    library version and the Python implementation and version.
+    '''
+    source = repr((__version__, sys.implementation.cache_tag, marshal.version, settings))
+    return hashlib.blake2b(source.encode('utf8'), digest_size=20).hexdigest()
+
+
+def read_sidecar(path: str | os.PathLike, fingerprint: Callable[[], str]) -> tuple[bool, Any]:
+    '''
+    Load data from the sidecar file for a data file.  Return `(True, <data>)`
+    if the sidecar exists and matches both the current contents of the data
+    file and the settings fingerprint, and `(False, None)` otherwise.
+    `fingerprint()` is only called if the sidecar exists.
+    '''
+    try:
+        f = open(sidecar_path(path), 'rb')
+    except OSError:
+        return (False, None)
+    with f:
+        try:
+            if f.read(len(sidecar_magic)) != sidecar_magic:
+                return (False, None)
+            header_length, = _header_length_struct.unpack(f.read(_header_length_struct.size))
+            header = json.loads(f.read(header_length).decode('utf8'))
+        except (struct.error, UnicodeDecodeError, ValueError):
+            return (False, None)
+        if (not isinstance(header, dict) or header.get('format_version') != sidecar_format_version or
+                header.get('fingerprint') != fingerprint()):
+            return (False, None)
+        try:
+            if header.get('source_hash') != source_hash(path):
+                return (False, None)
+        except OSError:
+            return (False, None)
+        try:
+            data = marshal.loads(f.read())
+        except (EOFError, ValueError, TypeError):
+            return (False, None)
+    return (True, data)
+
+
+def write_sidecar_data(path: str | os.PathLike, data: Any, data_hash: str, fingerprint: str) -> pathlib.Path:
+    '''
+    Write data to the sidecar file for a data file, and return the sidecar
+    path.  The sidecar is written to a temporary file and then moved into
+    place, so readers never see a partial sidecar.
+    '''
+    header = json.dumps({
+        'format_version': sidecar_format_version,
+        'source_hash': data_hash,
+        'fingerprint': fingerprint,
+    }).encode('utf8')
+    try:
+        payload = marshal.dumps(data)
+    except ValueError:
+        raise TypeError('Data contains values that cannot be stored in a sidecar file')
+    path_sidecar = sidecar_path(path)
+    atomic_write(path_sidecar, [sidecar_magic, _header_length_struct.pack(len(header)), header, payload])
+    return path_sidecar
+
+
+def atomic_write(path: pathlib.Path, parts: list[bytes]):
+    '''
+    Write data to a temporary file and then move it into place, so readers
+    never see a partial file.
+    '''
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for part in parts:
+                f.write(part)
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import mmap
+import time
+from typing import Any, Iterator, NamedTuple
+from . import schema as schema_module
+
+
+
+
+class _CacheCounts(NamedTuple):
+    start_time: float
+    validator_hits: int
+    validator_misses: int
+    schema_hits: int
+    schema_misses: int
+
+
+class LoadStats(object):
+    '''
+    Collector for timing and counters from loading functions.  Pass an
+    instance as the `stats` argument of a loading function.  Values
+    accumulate when the same instance is used for multiple loads.
+
+    `phase_times` maps phases to wall time in seconds:
+
+     *  `read`:  reading data from a file (not including memory-mapped data,
+        which is read as it is parsed).
+     *  `metadata`:  loading metadata and processing the schema.
+     *  `parse`:  extracting raw `dict[str, str]` data, including checking
+        data structure and keys.
+     *  `decode`:  converting and validating values according to the schema.
+     *  `nesting`:  creating nested dicts for key paths.
+     *  `total`:  everything.
+
+    `annotation_counts` and `annotation_times` give the number of values
+    decoded and the time spent for each schema type annotation.  Values for
+    keys that are not in the schema are listed under `<schema_missing>`.
+
+    Cache counters are the change in global counters during loading, so they
+    include any activity in other threads.  Validator cache lookups only
+    occur when a schema is compiled, not when a compiled schema is reused.
+    '''
+    missing_annotation = '<schema_missing>'
+
+    def __init__(self):
+        self.phase_times: dict[str, float] = {}
+        self.bytes: int = 0
+        self.records: int = 0
+        self.values: int = 0
+        self.annotation_counts: dict[str, int] = {}
+        self.annotation_times: dict[str, float] = {}
+        self.validator_cache_hits: int = 0
+        self.validator_cache_misses: int = 0
+        self.schema_cache_hits: int = 0
+        self.schema_cache_misses: int = 0
+        self.load_cache_hits: int = 0
+        self.sidecar_hits: int = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} records={self.records} bytes={self.bytes}>'
+
+    def add_time(self, phase: str, seconds: float):
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+
+    def add_annotation(self, annot: str, seconds: float):
+        self.annotation_counts[annot] = self.annotation_counts.get(annot, 0) + 1
+        self.annotation_times[annot] = self.annotation_times.get(annot, 0.0) + seconds
+
+    def begin(self, data: str | bytes | bytearray | memoryview | mmap.mmap | None = None) -> _CacheCounts:
+        '''
+        Start timing a load, and record the size of data in bytes.  The
+        returned value must be passed to `end()`.
+        '''
+        if data is not None:
+            if isinstance(data, str):
+                self.bytes += len(data.encode('utf8', 'surrogatepass'))
+            elif isinstance(data, memoryview):
+                self.bytes += data.nbytes
+            else:
+                self.bytes += len(data)
+        schema_cache_info = schema_module._compile_schema_items.cache_info()
+        validator_dict = schema_module.validator_dict
+        return _CacheCounts(time.perf_counter(), validator_dict.hits, validator_dict.misses,
+                            schema_cache_info.hits, schema_cache_info.misses)
+
+    def end(self, counts: _CacheCounts):
+        '''
+        Finish timing a load.
+        '''
+        self.add_time('total', time.perf_counter() - counts.start_time)
+        schema_cache_info = schema_module._compile_schema_items.cache_info()
+        validator_dict = schema_module.validator_dict
+        self.validator_cache_hits += validator_dict.hits - counts.validator_hits
+        self.validator_cache_misses += validator_dict.misses - counts.validator_misses
+        self.schema_cache_hits += schema_cache_info.hits - counts.schema_hits
+        self.schema_cache_misses += schema_cache_info.misses - counts.schema_misses
+
+    def timed_iter(self, iterator: Iterator[Any], phase: str) -> Iterator[Any]:
+        '''
+        Yield from an iterator, adding the time spent producing each item to
+        a phase.
+        '''
+        perf_counter = time.perf_counter
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(phase, perf_counter() - start)
+                return
+            self.add_time(phase, perf_counter() - start)
+            yield item
+
+    def update(self, other: LoadStats):
+        '''
+        Add the statistics from another instance, for example one that was
+        used in a different process.
+        '''
+        for phase, seconds in other.phase_times.items():
+            self.add_time(phase, seconds)
+        for annot, count in other.annotation_counts.items():
+            self.annotation_counts[annot] = self.annotation_counts.get(annot, 0) + count
+            self.annotation_times[annot] = self.annotation_times.get(annot, 0.0) + other.annotation_times[annot]
+        for attr in ('bytes', 'records', 'values', 'validator_cache_hits', 'validator_cache_misses',
+                     'schema_cache_hits', 'schema_cache_misses', 'load_cache_hits', 'sidecar_hits'):
+            setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'phase_times': dict(self.phase_times),
+            'bytes': self.bytes,
+            'records': self.records,
+            'values': self.values,
+            'annotation_counts': dict(self.annotation_counts),
+            'annotation_times': dict(self.annotation_times),
+            'validator_cache_hits': self.validator_cache_hits,
+            'validator_cache_misses': self.validator_cache_misses,
+            'schema_cache_hits': self.schema_cache_hits,
+            'schema_cache_misses': self.schema_cache_misses,
+            'load_cache_hits': self.load_cache_hits,
+            'sidecar_hits': self.sidecar_hits,
+        }
+
+    def report(self) -> str:
+        '''
+        Summary of all statistics as text.
+        '''
+        lines = [f'bytes: {self.bytes}', f'records: {self.records}', f'values: {self.values}', 'phases:']
+        for phase, seconds in self.phase_times.items():
+            lines.append(f'  {phase}: {seconds*1000:.3f} ms')
+        if self.annotation_counts:
+            lines.append('annotations:')
+            for annot, count in sorted(self.annotation_counts.items(), key=lambda x: -self.annotation_times[x[0]]):
+                lines.append(f'  {annot}: {count} values, {self.annotation_times[annot]*1000:.3f} ms')
+        lines.append(f'validator cache: {self.validator_cache_hits} hits, {self.validator_cache_misses} misses')
+        lines.append(f'schema cache: {self.schema_cache_hits} hits, {self.schema_cache_misses} misses')
+        if self.load_cache_hits:
+            lines.append(f'load cache: {self.load_cache_hits} hits')
+        if self.sidecar_hits:
+            lines.append(f'sidecar: {self.sidecar_hits} hits')
+        return '\n'.join(lines)
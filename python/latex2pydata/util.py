@@ -11,18 +11,99 @@
 from __future__ import annotations
 
 import collections
-from typing import Any, Callable
+import threading
+from typing import Any, Callable, Hashable, NamedTuple
 
 
-class KeyDefaultDict(collections.defaultdict):
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache(object):
     '''
-    Default dict that passes missing keys to the factory function, rather than
-    calling the factory function with no arguments.
+    Thread-safe cache with at most `maxsize` entries, which are created by
+    passing keys to a factory function.  Least recently used entries are
+    removed first.  If `normalize` is given, keys are normalized with it
+    before lookup, so that equivalent keys share an entry.
+
+    When multiple threads request a missing key at the same time, the factory
+    is only called once; other threads wait for the result.  The factory is
+    called without holding the cache lock, so it may look up other keys.  If
+    the factory raises an exception, nothing is cached.
     '''
-    __init__: Callable[[Callable[[Any], Any]], None]
-    default_factory: Callable[[Any], Any]
-    def __missing__(self, key):
-        if self.default_factory is None:
-            raise KeyError(key)
-        self[key] = self.default_factory(key)
-        return self[key]
+    def __init__(self, factory: Callable[[Any], Any], maxsize: int = 1024,
+                 normalize: Callable[[Any], Hashable] | None = None):
+        if maxsize < 1:
+            raise ValueError('"maxsize" must be a positive integer')
+        self.factory: Callable[[Any], Any] = factory
+        self.maxsize: int = maxsize
+        self.normalize: Callable[[Any], Hashable] | None = normalize
+        self.hits: int = 0
+        self.misses: int = 0
+        self._data: collections.OrderedDict[Hashable, Any] = collections.OrderedDict()
+        self._pending: dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: Any) -> Any:
+        if self.normalize is not None:
+            key = self.normalize(key)
+        while True:
+            with self._lock:
+                try:
+                    value = self._data[key]
+                except KeyError:
+                    pending = self._pending.get(key)
+                    if pending is None:
+                        pending = threading.Event()
+                        self._pending[key] = pending
+                        self.misses += 1
+                        break
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+            # Another thread is creating the entry.  Once it is finished,
+            # try again, which gives a cache hit unless it failed.
+            pending.wait()
+        try:
+            value = self.factory(key)
+        except BaseException:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+            raise
+        with self._lock:
+            self._data[key] = value
+            del self._pending[key]
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        pending.set()
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        if self.normalize is not None:
+            key = self.normalize(key)
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    @property
+    def hit_rate(self) -> float:
+        '''
+        Fraction of lookups that were cache hits (0.0 if there have been no
+        lookups).
+        '''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023-2025, Geoffrey M. Poore
+# All rights reserved.
+#
+# Licensed under the BSD 3-Clause License:
+# https://opensource.org/license/BSD-3-Clause
+#
+
+
+from __future__ import annotations
+
+import functools
+import io
+import mmap
+import pathlib
+from typing import Any, NamedTuple
+from .err import Latex2PydataError
+from .loading import (Parser, _iter_raw_data_dicts, _keypath_conflict_error, _load_leading_metadata,
+                      _load_readable, _process_schema, max_nesting_plans)
+from .scanning import RecordScanner
+from .schema import CompiledSchema, SchemaMissing
+
+
+
+
+class ValidationResult(NamedTuple):
+    '''
+    Result of `validate()` or `validate_file()`.
+
+    `records` is the number of dicts that were checked.  `errors` is a list
+    of all errors found, in the order in which they occur in the data.  Each
+    error has `record` and `key` attributes giving its location, which are
+    `None` for errors that do not belong to a dict or key (metadata and
+    schema errors, invalid data structure).  `truncated` is `True` if
+    checking stopped after `max_errors` errors.  `path` is set for files
+    loaded from a path.
+    '''
+    records: int
+    errors: list[Exception]
+    truncated: bool = False
+    path: pathlib.Path | None = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+
+
+def _keypath_conflicts(keys: tuple[str, ...]) -> bool:
+    # Whether any key is also a prefix of a key path, so that nesting depends
+    # on the decoded values
+    prefixes = set()
+    for k in keys:
+        if '.' in k:
+            keypath = k.split('.')
+            prefixes.update('.'.join(keypath[:n]) for n in range(1, len(keypath)))
+    return any(k in prefixes for k in keys)
+
+
+def _check_keypath(data_dict: dict[str, Any], raw_k: str, v: Any):
+    # Nest a decoded value as in loading, raising an error if a key path
+    # passes through a value that is not a dict
+    keypath = raw_k.split('.')
+    loc = data_dict
+    try:
+        for kp_elem in keypath[:-1]:
+            try:
+                loc = loc[kp_elem]
+            except KeyError:
+                new_dict = {}
+                loc[kp_elem] = new_dict
+                loc = new_dict
+        loc[keypath[-1]] = v
+    except TypeError:
+        raise _keypath_conflict_error(raw_k)
+
+
+
+
+def validate(string: str | bytes | bytearray | memoryview | mmap.mmap,
+             schema: dict[str, str] | CompiledSchema | None = None,
+             schema_missing: SchemaMissing | None = None,
+             parser: Parser = 'scan',
+             max_errors: int | None = None) -> ValidationResult:
+    '''
+    Check data in a string, collecting all errors rather than raising the
+    first one.  Values are decoded and validated according to the schema, but
+    are then discarded, so no output dicts are created (except for dicts in
+    which a key is also a prefix of a key path).
+
+    Invalid values are reported for every key in every dict, as are key
+    paths that conflict with other keys (for example, `a.b` when the value of
+    `a` is not a dict).  Errors in metadata or the schema, or in the
+    structure of the data, stop checking, since the rest of the data cannot
+    be interpreted reliably.  If `max_errors` is set, checking stops after
+    that many errors.
+    '''
+    if max_errors is not None and max_errors < 1:
+        raise ValueError('"max_errors" must be a positive integer')
+    try:
+        metadata, pos = _load_leading_metadata(string)
+        schema = _process_schema(metadata, schema, schema_missing)
+    except Latex2PydataError as e:
+        return ValidationResult(0, [e])
+    errors: list[Exception] = []
+    record = 0
+    get_decoder = schema.get_decoder
+    conflicts: dict[tuple[str, ...], bool] = {}
+    try:
+        for raw_data_dict in _iter_raw_data_dicts(RecordScanner(string, pos=pos), parser):
+            # Decoded values are only kept when key paths may conflict
+            keys = tuple(raw_data_dict)
+            try:
+                conflict = conflicts[keys]
+            except KeyError:
+                conflict = _keypath_conflicts(keys)
+                if len(conflicts) < max_nesting_plans:
+                    conflicts[keys] = conflict
+            data_dict: dict[str, Any] | None = {} if conflict else None
+            for raw_k, raw_v in raw_data_dict.items():
+                try:
+                    v = get_decoder(raw_k)(raw_k, raw_v)
+                    if data_dict is not None:
+                        if '.' in raw_k:
+                            _check_keypath(data_dict, raw_k, v)
+                        else:
+                            data_dict[raw_k] = v
+                except Latex2PydataError as e:
+                    e.record = record
+                    e.key = raw_k
+                    errors.append(e)
+                    if max_errors is not None and len(errors) >= max_errors:
+                        return ValidationResult(record + 1, errors, True)
+            record += 1
+    except Latex2PydataError as e:
+        errors.append(e)
+    return ValidationResult(record, errors)
+
+
+def validate_file(readable: pathlib.Path | io.BytesIO | io.TextIOBase,
+                  encoding: str | None = None,
+                  schema: dict[str, str] | CompiledSchema | None = None,
+                  schema_missing: SchemaMissing | None = None,
+                  parser: Parser = 'scan',
+                  max_errors: int | None = None) -> ValidationResult:
+    '''
+    Check data in a file, as for `validate()`.  Errors in reading the file
+    are raised rather than collected.
+    '''
+    result = _load_readable(readable, encoding,
+                            functools.partial(validate, schema=schema, schema_missing=schema_missing,
+                                              parser=parser, max_errors=max_errors))
+    if isinstance(readable, pathlib.Path):
+        result = result._replace(path=readable)
+    return result
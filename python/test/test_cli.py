@@ -0,0 +1,56 @@
+import json
+import tempfile
+import latex2pydata.cli
+
+
+def test_cli(tmp_path, capsys, monkeypatch):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'one.pydata').write_text('[{"a": "1", "b": "x"}, {"a": "2", "b": "y"}]', encoding='utf8')
+    (tmp_path / 'sub' / 'two.pydata').write_text('{"a": "3", "b": "z"}', encoding='utf8')
+    (tmp_path / 'schema.json').write_text('{"a": "int", "b": "verbatim"}', encoding='utf8')
+    schema_args = ['--schema', str(tmp_path / 'schema.json'), '--workers', '1']
+
+    assert latex2pydata.cli.main(['validate', str(tmp_path), *schema_args]) == 0
+    out = capsys.readouterr().out
+    assert 'one.pydata: ok (2 records)' in out and 'two.pydata: ok (1 records)' in out
+
+    assert latex2pydata.cli.main(['convert', str(tmp_path), '-o', '-', '-q', *schema_args]) == 0
+    out = capsys.readouterr().out
+    assert [json.loads(line) for line in out.splitlines()] == [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}, {"a": 3, "b": "z"}]
+
+    assert latex2pydata.cli.main(['convert', str(tmp_path), '-o', str(tmp_path / 'out'), *schema_args]) == 0
+    assert (tmp_path / 'out' / 'sub' / 'two.jsonl').read_text(encoding='utf8') == '{"a": 3, "b": "z"}\n'
+    capsys.readouterr()
+
+    assert latex2pydata.cli.main(['stats', str(tmp_path / '*.pydata'), '--json', *schema_args]) == 0
+    out = capsys.readouterr().out
+    assert json.loads(out)['records'] == 2
+
+    (tmp_path / 'sub' / 'bad.pydata').write_text('[{"a": "x"}]', encoding='utf8')
+    assert latex2pydata.cli.main(['validate', str(tmp_path), str(tmp_path / 'missing.pydata'), *schema_args]) == 1
+    err = capsys.readouterr().err
+    assert 'bad.pydata: error: record 0, key "a": Latex2PydataInvalidDataError' in err
+    assert 'missing.pydata: error: FileNotFoundError' in err
+
+    assert latex2pydata.cli.main(['validate', str(tmp_path / 'empty_dir_*')]) == 2
+
+    # Output for stdout goes through temporary files, which are removed, and
+    # a file that fails produces no output
+    (tmp_path / 'sub' / 'bad.pydata').write_text('[{"a": "4"}, {"a": "x"}]', encoding='utf8')
+    (tmp_path / 'tmp').mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'tmp'))
+    assert latex2pydata.cli.main(['convert', str(tmp_path / 'sub'), '-o', '-', '-q', *schema_args]) == 1
+    out = capsys.readouterr().out
+    assert [json.loads(line) for line in out.splitlines()] == [{"a": 3, "b": "z"}]
+    assert list((tmp_path / 'tmp').iterdir()) == []
+
+    # Serial runs don't leave settings behind in the calling process
+    assert latex2pydata.cli._worker_settings == {}
+
+
+def test_cli_workers(tmp_path, capsys):
+    for n in range(6):
+        (tmp_path / f'data{n}.pydata').write_text(f'[{{"key": "{n}"}}]', encoding='utf8')
+    assert latex2pydata.cli.main(['convert', str(tmp_path), '-o', '-', '--workers', '2']) == 0
+    out = capsys.readouterr().out
+    assert [json.loads(line) for line in out.splitlines()] == [{"key": str(n)} for n in range(6)]
@@ -0,0 +1,59 @@
+import array
+import io
+import pytest
+import textwrap
+import latex2pydata
+
+
+data_str = textwrap.dedent('''\
+    # latex2pydata metadata: {"schema": {"n": "int", "x": "float", "name": "str"}, "schema_missing": "verbatim"}
+    [
+    {"n": "1", "x": "1.5", "name": "\\"a\\"", "extra.sub": "e1"},
+    {"n": "2", "name": "\\"b\\""},
+    {"extra.other": "e3", "n": "3", "x": "3.5"},
+    ]
+    ''')
+
+
+def test_loads_columns():
+    columns = latex2pydata.loads_columns(data_str)
+    assert columns == {
+        "n": [1, 2, 3],
+        "x": [1.5, None, 3.5],
+        "name": ["a", "b", None],
+        "extra.sub": ["e1", None, None],
+        "extra.other": [None, None, "e3"],
+    }
+    assert list(columns) == ["n", "x", "name", "extra.sub", "extra.other"]
+    columns = latex2pydata.loads_columns(data_str, schema={"n": "int", "missing": "int"}, schema_missing="verbatim")
+    assert list(columns) == ["n", "x", "name", "extra.sub", "extra.other", "missing"]
+    assert columns["missing"] == [None, None, None] and columns["x"] == ["1.5", None, "3.5"]
+
+    columns = latex2pydata.loads_columns(data_str, column_type="array", missing=float("nan"))
+    assert columns["n"] == array.array("q", [1, 2, 3])
+    assert isinstance(columns["x"], array.array) and columns["x"][2] == 3.5
+    assert columns["extra.sub"][1] != columns["extra.sub"][1]
+
+    columns = latex2pydata.loads_columns(data_str, column_type="array")
+    assert isinstance(columns["n"], array.array)
+    assert columns["x"] == [1.5, None, 3.5]
+
+    # bool passes the int annotation, and must not be stored as 1 or 0
+    columns = latex2pydata.loads_columns(data_str.replace('"n": "2"', '"n": "True"'), column_type="array")
+    assert columns["n"] == [1, True, 3] and columns["n"][1] is True
+
+    assert latex2pydata.load_columns(io.StringIO('{"a": "1"}')) == {"a": ["1"]}
+    assert latex2pydata.loads_columns('[]', schema={"a": "int"}, column_type="array") == {"a": array.array("q")}
+
+    with pytest.raises(ValueError):
+        latex2pydata.loads_columns(data_str, column_type="tuple")
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        latex2pydata.loads_columns(data_str.replace('"1.5"', '"one"'))
+
+
+def test_loads_columns_numpy():
+    numpy = pytest.importorskip("numpy")
+    columns = latex2pydata.loads_columns(data_str, column_type="numpy", missing=0)
+    assert isinstance(columns["n"], numpy.ndarray) and columns["n"].tolist() == [1, 2, 3]
+    assert columns["x"].tolist() == [1.5, 0.0, 3.5]
+    assert columns["name"] == ["a", "b", 0]
@@ -0,0 +1,76 @@
+import pytest
+import textwrap
+import latex2pydata
+
+
+data_str = textwrap.dedent('''\
+    # latex2pydata metadata: {"schema": {"n": "int"}, "schema_missing": "verbatim"}
+    [
+    {"n": "1", "text": """\\
+    multi
+    line
+    """},
+    # comment
+    {"n": "2", "key.sub": "value"},
+    {"n": "3"},
+    ]
+    ''')
+
+
+def test_incremental_loader(tmp_path):
+    path = tmp_path / "data.pydata"
+    expected = latex2pydata.loads(data_str)
+    data_bytes = data_str.encode("utf8")
+    for step in (1, 7, 40):
+        path.write_bytes(b"")
+        loader = latex2pydata.IncrementalLoader(path)
+        assert loader.refresh() == [] and loader.data is None
+        records = []
+        for end in range(0, len(data_bytes) + step, step):
+            with open(path, "ab") as f:
+                f.write(data_bytes[len(path.read_bytes()):end])
+            records.extend(loader.refresh())
+        assert records == expected
+        assert loader.data == expected
+        assert loader.complete
+        assert loader.refresh() == []
+
+    # Rewritten file is reloaded
+    path.write_bytes(data_bytes.replace(b'"1"', b'"10"'))
+    assert [d["n"] for d in loader.refresh()] == [10, 2, 3]
+    assert [d["n"] for d in loader.records] == [10, 2, 3]
+
+    # A rewrite with the same size far before the end of the data is detected
+    big_bytes = ('[\n' + ''.join(f'{{"n": "{n:04d}"}},\n' for n in range(1000))).encode("utf8")
+    path.write_bytes(big_bytes)
+    loader = latex2pydata.IncrementalLoader(path)
+    assert len(loader.refresh()) == 1000
+    path.write_bytes(big_bytes.replace(b'"0001"', b'"9999"'))
+    assert [d["n"] for d in loader.refresh()][:3] == ["0000", "9999", "0002"]
+    with open(path, "ab") as f:
+        f.write(b'{"n": "1000"}]\n# comment\n')
+    assert loader.refresh() == [{"n": "1000"}] and loader.complete and len(loader.records) == 1001
+
+    # Data after the end of the list is invalid
+    with open(path, "ab") as f:
+        f.write(b'{"n": "1001"}\n')
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        loader.refresh()
+
+    # Single dict
+    path.write_bytes(b'{"n": "1"')
+    loader = latex2pydata.IncrementalLoader(path, schema={"n": "int"})
+    assert loader.refresh() == [] and loader.data is None
+    with open(path, "ab") as f:
+        f.write(b"}\n")
+    assert loader.refresh() == [{"n": 1}] and loader.data == {"n": 1}
+    with open(path, "ab") as f:
+        f.write(b"[]")
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        loader.refresh()
+
+    path.write_bytes(b'[\n{"n": "1"} {"n": "2"}]')
+    loader = latex2pydata.IncrementalLoader(path)
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        loader.refresh()
+    assert loader.records == [{"n": "1"}]
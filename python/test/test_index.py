@@ -0,0 +1,30 @@
+import os
+import pytest
+import latex2pydata
+
+
+def test_load_record(tmp_path):
+    path = tmp_path / 'data.pydata'
+    path.write_text('# latex2pydata metadata: {"schema": {"n": "int", "a.b": "verbatim"}}\n'
+                    '[\n' + ''.join(f'{{"n": "{n}", "a.b": "x{n}"}},\n' for n in range(10)) + ']\n', encoding='utf8')
+    assert latex2pydata.load_record(path, 3) == {"n": 3, "a": {"b": "x3"}}
+    assert latex2pydata.index.index_path(path).exists()
+    assert latex2pydata.load_records(path, [9, 0, -2]) == [latex2pydata.load(path)[i] for i in (9, 0, -2)]
+    assert len(latex2pydata.open_index(path, update=False)) == 10
+    with pytest.raises(IndexError):
+        latex2pydata.load_record(path, 10)
+
+    # Modification time changes without content changes don't require a new
+    # index; content changes do
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert latex2pydata.open_index(path, update=False).mtime_ns == stat.st_mtime_ns + 10**9
+    path.write_text(path.read_text(encoding='utf8').replace('"x3"', '"y3"'), encoding='utf8')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2*10**9))
+    with pytest.raises(ValueError):
+        latex2pydata.open_index(path, update=False)
+    assert latex2pydata.load_record(path, 3) == {"n": 3, "a": {"b": "y3"}}
+
+    path.write_text('{"n": "1"}', encoding='utf8')
+    latex2pydata.build_index(path)
+    assert latex2pydata.load_record(path, 0, schema={"n": "int"}) == {"n": 1}
@@ -1,3 +1,6 @@
+import ast
+import io
+import pickle
 import pytest
 import textwrap
 import latex2pydata
@@ -100,8 +103,471 @@ def test_loads_invalid_schema():
         latex2pydata.loads(data_str)
 
     with pytest.raises(latex2pydata.err.Latex2PydataSchemaError):
-        # nested too deep
+        # collection union
         data_str = textwrap.dedent('''\
-            # latex2pydata metadata: {"schema": {"key1": "list[list[list[int]]]"}}
+            # latex2pydata metadata: {"schema": {"key1": "list[int]|set[int]"}}
             ''')
         latex2pydata.loads(data_str)
+
+    with pytest.raises(latex2pydata.err.Latex2PydataSchemaError):
+        # subscripted scalar
+        data_str = textwrap.dedent('''\
+            # latex2pydata metadata: {"schema": {"key1": "Any[int]"}}
+            ''')
+        latex2pydata.loads(data_str)
+
+
+def test_loads_nested_schema():
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"key1": "list[list[list[int]]]", "key2": "tuple[int, str|None]", "key3": "dict[str, tuple[float, ...]]"}}
+        {"key1": "[[[1], [2, 3]], []]", "key2": "(1, None)", "key3": "{'a': (1.5, 2.5), 'b': ()}"}
+        ''')
+    assert latex2pydata.loads(data_str) == {"key1": [[[1], [2, 3]], []], "key2": (1, None), "key3": {"a": (1.5, 2.5), "b": ()}}
+    for invalid in ('"[[1]]"', '"[[[1.5]]]"'):
+        with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+            latex2pydata.loads(data_str.replace('"[[[1], [2, 3]], []]"', invalid))
+    for invalid in ('"(1,)"', '"(1, 2)"', '"[1, None]"'):
+        with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+            latex2pydata.loads(data_str.replace('"(1, None)"', invalid))
+    assert str(latex2pydata.schema.parse_annot("dict[ str, int|None|int ]")) == "dict[str,None|int]"
+
+
+def test_iterloads():
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"key1": "int", "key2.sub": "list[int]"}, "schema_missing": "verbatim"}
+        [
+        {
+        "key1": "1",
+        "key2.sub": "[1, 2]",
+        },
+        {
+        "key1": "2",
+        "key3": """\\
+        multiline {
+        value ]
+        """,
+        },
+        ]
+        ''')
+    expected = [{"key1": 1, "key2": {"sub": [1, 2]}}, {"key1": 2, "key3": "multiline {\nvalue ]\n"}]
+    assert list(latex2pydata.iterloads(data_str)) == expected
+    assert latex2pydata.loads(data_str) == expected
+    # Reading a small chunk at a time must give the same result
+    for chunk_size in (1, 7, 1000):
+        assert list(latex2pydata.iterload(io.StringIO(data_str), chunk_size=chunk_size)) == expected
+        assert list(latex2pydata.iterload(io.BytesIO(data_str.encode('utf8')), chunk_size=chunk_size)) == expected
+
+    assert list(latex2pydata.iterloads('{"key": "value"}')) == [{"key": "value"}]
+    assert list(latex2pydata.iterloads('[]')) == []
+
+
+def test_iterload_read_sizes():
+    # Reads stay at the chunk size for many small records, and only grow
+    # while a single record is larger than the data read so far
+    class SizeRecordingIO(io.StringIO):
+        def read(self, size=-1):
+            sizes.append(size)
+            return super().read(size)
+
+    sizes = []
+    record = '{"key": "%s"},\n' % ('x' * 50)
+    data_str = '[\n' + record * 2000 + ']\n'
+    assert len(list(latex2pydata.iterload(SizeRecordingIO(data_str), chunk_size=1000))) == 2000
+    assert max(sizes) == 1000
+
+    sizes = []
+    data_str = '[\n{"key": "%s"},\n{"key": "x"}\n]\n' % ('x' * 100_000)
+    assert len(list(latex2pydata.iterload(SizeRecordingIO(data_str), chunk_size=1000))) == 2
+    assert max(sizes) > 1000 and len(sizes) < 20
+
+
+def test_iterloads_invalid_data():
+    for data_str in ('[{"key": "value"}', '[{"key": "value"} {"key": "value"}]', '["value"]',
+                     '[{"key": 1}]', '[{"key": """value}]', '{"key": "value"} []', ''):
+        with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+            list(latex2pydata.iterloads(data_str))
+
+
+def test_loads_parsers():
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": None, "schema_missing": "verbatim"}
+        [
+        {
+        "key1": "\\\\textbf{\\u00e9} \\"quote\\" \\x41",
+        # comment: "key1": "ignored",
+        'key2' : r'\\raw' "concat",
+        "key3": """\\
+        multiline
+        """,
+        },
+        {},
+        ]
+        ''')
+    expected = [{"key1": "\\textbf{\u00e9} \"quote\" A", "key2": "\\rawconcat", "key3": "multiline\n"}, {}]
+    assert latex2pydata.loads(data_str) == expected
+    assert latex2pydata.loads(data_str, parser='literal_eval') == expected
+
+    for data_str in ('[{"key": 1}]', '[{"key": b"value"}]', '[{"bad key": "value"}]', '[{"key" "value"}]'):
+        for parser in ('scan', 'literal_eval'):
+            with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+                latex2pydata.loads(data_str, parser=parser)
+
+    # Valid literals that the scanner does not handle directly give the same
+    # result as ast.literal_eval(), also when read in small chunks
+    for data_str in ('{"a": ("1")}', '{("a"): "1"}', '{"a": "1", \\\n "b": "2"}',
+                     '[{"a": "1"}, \\\n{"b": ("2" "3")}, {"c": "4"}]'):
+        expected = latex2pydata.loads(data_str, parser='literal_eval')
+        assert latex2pydata.loads(data_str) == expected
+        assert latex2pydata.loads(data_str.encode('utf8')) == expected
+        expected_records = expected if isinstance(expected, list) else [expected]
+        for chunk_size in (1, 2, 3):
+            assert list(latex2pydata.iterload(io.StringIO(data_str), chunk_size=chunk_size)) == expected_records
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        latex2pydata.loads('{"a": ("1",)}')
+
+
+def test_compile_schema():
+    schema = latex2pydata.compile_schema({"key1": "int", "key2.sub": "list[ int ]"})
+    assert schema is latex2pydata.compile_schema({"key1": "int", "key2.sub": "list[int]"})
+    reordered = latex2pydata.compile_schema({"key2.sub": "list[int]", "key1": "int"})
+    assert list(reordered.entries) == ["key2.sub", "key1"] and reordered.fingerprint == schema.fingerprint
+    assert schema.entries["key2.sub"].keypath == ("key2", "sub")
+    with pytest.raises(AttributeError):
+        schema.schema_missing = 'verbatim'
+    data_str = '{"key1": "1", "key2.sub": "[2]", "key3": "3"}'
+    assert latex2pydata.loads(data_str, schema=schema, schema_missing='evalany') == {"key1": 1, "key2": {"sub": [2]}, "key3": 3}
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        latex2pydata.loads(data_str, schema=schema)
+    # Metadata settings apply unless the compiled schema overrides them
+    data_str = '# latex2pydata metadata: {"schema": {"key1": "str"}, "schema_missing": "verbatim"}\n' + data_str
+    assert latex2pydata.loads(data_str, schema=schema) == {"key1": 1, "key2": {"sub": [2]}, "key3": "3"}
+    schema = latex2pydata.compile_schema({"key1": "int", "key2.sub": "list[int]"}, schema_missing='error')
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        latex2pydata.loads(data_str, schema=schema)
+
+    with pytest.raises(latex2pydata.err.Latex2PydataSchemaError):
+        latex2pydata.compile_schema({"key1": "list[int"})
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidMetadataError):
+        latex2pydata.compile_schema({"key1": "int"}, schema_missing='other')
+
+
+def test_loads_fast_scalar_decoders():
+    schema = {"key1": "int", "key2": "float", "key3": "bool|None", "key4": "str", "key5": "int|float"}
+    data_str = '{"key1": "-1_000", "key2": "1.5e3", "key3": "None", "key4": "r\'\\\\x\'", "key5": "2."}'
+    assert latex2pydata.loads(data_str, schema=schema) == {"key1": -1000, "key2": 1500.0, "key3": None, "key4": "\\x", "key5": 2.0}
+    # Less common literal forms are handled by ast.literal_eval()
+    data_str = '{"key1": "0x10", "key2": "(1.5)", "key3": "False", "key4": "\'a\' \'b\'", "key5": "True"}'
+    assert latex2pydata.loads(data_str, schema=schema) == {"key1": 16, "key2": 1.5, "key3": False, "key4": "ab", "key5": True}
+    for key, value in (("key1", "1.0"), ("key1", "01"), ("key2", "1"), ("key3", "true"), ("key4", "b'a'"), ("key5", "inf")):
+        with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+            latex2pydata.loads(f'{{"{key}": "{value}"}}', schema=schema)
+
+    # Results are identical to ast.literal_eval(), including for raw carriage
+    # returns and null characters
+    decode = latex2pydata.compile_schema({"key": "str"}).get_decoder("key")
+    for raw_value in ('"a\rb"', "'a\rb'", 'r"a\rb"', '"""a\rb"""', '"""a\r\nb"""', '"a\\\rb"',
+                      '"a\\\r\nb"', '"a\x00b"', '"""a\x00b"""', '"a\\x00b"'):
+        try:
+            expected = ast.literal_eval(raw_value)
+        except SyntaxError:
+            with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+                decode("key", raw_value)
+        else:
+            assert decode("key", raw_value) == expected
+
+
+def test_load_cache(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    path = tmp_path / 'data.pydata'
+    path.write_text('# latex2pydata metadata: {"schema": {"key": "int"}}\n[{"key": "1"}]\n', encoding='utf8')
+    assert latex2pydata.load(path, cache_dir=cache_dir) == [{"key": 1}]
+    cache_files = list(cache_dir.iterdir())
+    assert len(cache_files) == 1 and cache_files[0].suffix == '.pickle'
+    # Modify the cache entry so that a cache hit can be detected
+    with open(cache_files[0], 'wb') as f:
+        pickle.dump([{"key": "cached"}], f)
+    assert latex2pydata.load(path, cache_dir=cache_dir) == [{"key": "cached"}]
+    # Different settings and different content are cache misses
+    assert latex2pydata.load(path, cache_dir=cache_dir, schema={"key": "str|int"}) == [{"key": 1}]
+    path.write_text('# latex2pydata metadata: {"schema": {"key": "int"}}\n[{"key": "2"}]\n', encoding='utf8')
+    assert latex2pydata.load(path, cache_dir=cache_dir) == [{"key": 2}]
+    assert len(list(cache_dir.iterdir())) == 3
+    # Eviction
+    latex2pydata.load(path, cache_dir=cache_dir, cache_max_size=0, schema={"key": "float|int"})
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_load_cache_eviction_scans(tmp_path, monkeypatch):
+    # The cache directory is only scanned when it may have grown too large
+    scans = []
+    evict = latex2pydata.cache.ParseCache.evict
+    monkeypatch.setattr(latex2pydata.cache.ParseCache, "evict", lambda self: scans.append(1) or evict(self))
+    cache = latex2pydata.cache.ParseCache(tmp_path / "cache", max_size=3000)
+    for n in range(100):
+        cache.set(str(n), "x" * 50)
+    assert 1 <= len(scans) < 30
+    assert sum(p.stat().st_size for p in (tmp_path / "cache").iterdir()) <= 3000
+
+
+def test_loads_bytes(tmp_path):
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"key1": "int"}, "schema_missing": "verbatim"}
+        [
+        {"key1": "1", "key2": "\\u00e9\u00e9\\\\"},
+        {"key1": "2", "key2": """\\
+        multiline
+        """},
+        ]
+        ''')
+    expected = [{"key1": 1, "key2": "\u00e9\u00e9\\"}, {"key1": 2, "key2": "multiline\n"}]
+    data_bytes = data_str.encode('utf8')
+    assert latex2pydata.loads(data_bytes) == expected
+    assert latex2pydata.loads(memoryview(b'\xef\xbb\xbf' + data_bytes)) == expected
+    assert list(latex2pydata.iterloads(bytearray(data_bytes))) == expected
+    assert latex2pydata.load(io.BytesIO(data_bytes)) == expected
+    path = tmp_path / 'data.pydata'
+    path.write_bytes(b'\xef\xbb\xbf' + data_str.replace('\n', '\r\n').encode('utf8'))
+    assert latex2pydata.load(path) == expected
+    assert latex2pydata.load(path, encoding='utf-8-sig', parser='literal_eval') == expected
+    path.write_bytes(b'')
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        latex2pydata.load(path)
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        latex2pydata.loads(b'{"key": "\xff"}')
+
+
+def test_loads_lazy():
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"key1": "int", "key2.sub": "list[int]", "key3": "int"}}
+        [
+        {"key1": "1", "key2.sub": "[1, 2]", "key3": "invalid"},
+        {"key1": "2"},
+        ]
+        ''')
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        latex2pydata.loads(data_str)
+    data = latex2pydata.loads(data_str, lazy=True)
+    assert isinstance(data[0], latex2pydata.LazyDict)
+    assert not data[0].is_decoded("key1")
+    assert data[0]["key1"] == 1
+    assert data[0].is_decoded("key1")
+    assert data[0]["key2"]["sub"] == [1, 2]
+    assert data[0]["key2"].get_raw("sub") == "[1, 2]"
+    assert data[0].get_raw("key3") == "invalid"
+    assert list(data[0]) == ["key1", "key2", "key3"]
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        data[0]["key3"]
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        data[0].materialize()
+    assert data[1] == {"key1": 2}
+    assert data[1].materialize() == {"key1": 2} and type(data[1].materialize()) is dict
+    assert [d.materialize() for d in latex2pydata.iterloads(data_str.replace('invalid', '3'), lazy=True)] == [
+        {"key1": 1, "key2": {"sub": [1, 2]}, "key3": 3}, {"key1": 2}
+    ]
+
+
+def test_loads_keypath_nesting_plans():
+    data_str = textwrap.dedent('''\
+        [
+        {"a.b": "1", "a.c": "2", "d": "3"},
+        {"a.b": "4", "a.c": "5", "d": "6"},
+        {"d": "7", "a.c.e": "8", "a.b": "9"},
+        {"a.b": "10", "a": "11"},
+        ]
+        ''')
+    assert latex2pydata.loads(data_str) == [
+        {"a": {"b": "1", "c": "2"}, "d": "3"},
+        {"a": {"b": "4", "c": "5"}, "d": "6"},
+        {"d": "7", "a": {"c": {"e": "8"}, "b": "9"}},
+        {"a": "11"},
+    ]
+    assert [list(d) for d in latex2pydata.loads(data_str)] == [["a", "d"], ["a", "d"], ["d", "a"], ["a"]]
+
+
+def test_loads_intern():
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"n": "int", "x": "float", "s": "verbatim", "a.b": "str"}}
+        [
+        {"n": "1000", "x": "0.5", "s": "short", "a.b": "\'abc\'"},
+        {"n": "1000", "x": "0.5", "s": "short", "a.b": "\'abc\'"},
+        {"s": "short", "n": "1000", "x": "-0.0", "a.b": "\'abc\'"},
+        ]
+        ''')
+    for stats in (None, latex2pydata.LoadStats()):
+        data = latex2pydata.loads(data_str, intern=True, stats=stats)
+        assert data == latex2pydata.loads(data_str)
+        assert data[0]["n"] is data[1]["n"] is data[2]["n"]
+        assert data[0]["x"] is data[1]["x"]
+        assert data[0]["s"] is data[1]["s"] is data[2]["s"]
+        assert data[0]["a"]["b"] is data[1]["a"]["b"]
+        assert all(k0 is k1 for k0, k1 in zip(data[0], data[1]))
+        assert str(data[2]["x"]) == "-0.0"
+    long_str = "x" * (latex2pydata.loading.max_interned_length + 1)
+    data = latex2pydata.loads(data_str.replace("short", long_str), intern=True)
+    assert data[0]["s"] == data[1]["s"] and data[0]["s"] is not data[1]["s"]
+    data = list(latex2pydata.iterloads(data_str, intern=True))
+    assert data[0]["n"] is data[1]["n"]
+    with pytest.raises(TypeError):
+        latex2pydata.loads(data_str, intern=True, lazy=True)
+
+
+def test_loads_record_type():
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"n": "int", "a.b": "int", "a.c.d": "verbatim"}}
+        [
+        {"n": "1", "a.b": "2", "a.c.d": "x"},
+        {"a.b": "3", "n": "4"},
+        ]
+        ''')
+    data = latex2pydata.loads(data_str, record_type="namedtuple")
+    assert data[0] == (1, data[0].a) and data[0].a == (2, ("x",))
+    assert data[1].a.b == 3 and data[1].a.c is None
+    assert type(data[0]) is type(latex2pydata.loads(data_str, record_type="namedtuple")[0])
+
+    data = latex2pydata.loads(data_str, record_type="slots")
+    assert isinstance(data[0], latex2pydata.SlotsRecord) and not hasattr(data[0], "__dict__")
+    assert list(data[0]._asdict().items()) == [("n", 1), ("a", {"b": 2, "c": {"d": "x"}})]
+    assert data[1]._asdict() == {"a": {"b": 3}, "n": 4}
+
+    data = latex2pydata.loads(data_str, record_type="nested", intern=True)
+    assert data[0].a.c.d == "x" and data[1].a.b == 3 and data[1].a.c is None
+    assert data[0] == latex2pydata.loads(data_str, record_type="nested")[0] != data[1]
+    assert list(latex2pydata.iterloads(data_str, record_type="nested")) == data
+
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError, match="not in the schema"):
+        latex2pydata.loads(data_str.replace('"n": "4"', '"m": "4"'), schema_missing="verbatim", record_type="slots")
+    with pytest.raises(ValueError):
+        latex2pydata.loads(data_str, record_type="tuple")
+    with pytest.raises(latex2pydata.err.Latex2PydataSchemaError):
+        latex2pydata.loads('{"a": "1"}', schema={"a": "int", "a.b": "int"}, record_type="namedtuple")
+    with pytest.raises(latex2pydata.err.Latex2PydataSchemaError):
+        latex2pydata.loads('{"a": "1"}', schema={"a": "int", "b._c": "int"}, record_type="slots")
+    for record_type in ("slots", "nested"):
+        data = latex2pydata.loads('{"self": "1", "a.self": "2"}', schema={"self": "int", "a.self": "int"},
+                                  record_type=record_type)
+        assert data.self == 1 and (data.a["self"] if record_type == "slots" else data.a.self) == 2
+    with pytest.raises(TypeError):
+        latex2pydata.loads('{"a": "1"}', record_type="namedtuple")
+
+
+def test_loads_keys_where():
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"kind": "str", "n": "int", "a.b": "int", "a.c": "int", "ab": "int"}}
+        [
+        {"kind": "\'figure\'", "n": "1", "a.b": "2", "a.c": "3", "ab": "4"},
+        {"kind": "\'table\'", "n": "invalid", "a.b": "invalid", "a.c": "invalid", "ab": "invalid"},
+        {"kind": "\'figure\'", "n": "5", "a.b": "6", "a.c": "7", "ab": "8"},
+        ]
+        ''')
+    def is_figure_raw(raw_data_dict):
+        return raw_data_dict["kind"] == "\'figure\'"
+    def is_figure(values):
+        return values["kind"] == "figure"
+    expected = [{"n": 1, "a": {"b": 2, "c": 3}}, {"n": 5, "a": {"b": 6, "c": 7}}]
+    assert latex2pydata.loads(data_str, keys=["n", "a"], where=is_figure_raw) == expected
+    assert latex2pydata.loads(data_str, keys=["n", "a"], where=is_figure, where_keys=["kind"]) == expected
+    assert list(latex2pydata.iterloads(data_str, keys=["a.c"], where=is_figure_raw)) == [{"a": {"c": 3}}, {"a": {"c": 7}}]
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError):
+        latex2pydata.loads(data_str, keys=["ab"])
+    assert latex2pydata.loads('{"x": "1"}', where=lambda d: False) is None
+
+    # Values decoded for `where_keys` are not decoded again
+    data_str = '[{"a.b": "[1]", "c": "[2]", "d": "[3]"}, {"c": "[2]", "a.b": "[1]"}]'
+    schema = {"a.b": "list[int]", "c": "list[int]", "d": "list[int]"}
+    for kwargs in ({}, {"keys": ["a", "c"]}, {"record_type": "nested"}, {"lazy": True},
+                   {"stats": latex2pydata.LoadStats()}):
+        seen = []
+        def where(values):
+            seen.append(values)
+            return True
+        data = latex2pydata.loads(data_str, schema=schema, where=where, where_keys=["a.b", "c"], **kwargs)
+        for record, values in zip(data, seen):
+            if kwargs.get("record_type"):
+                assert record.a.b is values["a.b"] and record.c is values["c"]
+            else:
+                assert record["a"]["b"] is values["a.b"] and record["c"] is values["c"]
+    with pytest.raises(TypeError):
+        latex2pydata.loads(data_str, keys="n")
+    with pytest.raises(TypeError):
+        latex2pydata.loads(data_str, where_keys=["kind"])
+
+
+def test_loads_stats(tmp_path):
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"key1": "int", "key2.sub": "list[int]"}, "schema_missing": "verbatim"}
+        [
+        {"key1": "1", "key2.sub": "[1, 2]", "key3": "a"},
+        {"key1": "2", "key2.sub": "[]"},
+        ]
+        ''')
+    stats = latex2pydata.LoadStats()
+    expected = latex2pydata.loads(data_str)
+    assert latex2pydata.loads(data_str, stats=stats) == expected
+    assert stats.records == 2 and stats.values == 5
+    assert stats.bytes == len(data_str.encode("utf8"))
+    assert stats.annotation_counts == {"int": 2, "list[int]": 2, "<schema_missing>": 1}
+    assert set(stats.phase_times) == {"metadata", "parse", "decode", "nesting", "total"}
+    assert stats.schema_cache_hits + stats.schema_cache_misses == 1
+    assert "records: 2" in stats.report()
+
+    path = tmp_path / "data.pydata"
+    path.write_text(data_str, encoding="utf8")
+    stats = latex2pydata.LoadStats()
+    assert latex2pydata.load(path, stats=stats) == expected
+    assert list(latex2pydata.iterload(path, stats=stats)) == expected
+    assert list(latex2pydata.iterloads(data_str.encode("utf8"), stats=stats)) == expected
+    assert stats.records == 6 and stats.as_dict()["bytes"] == 2 * len(data_str.encode("utf8"))
+    with pytest.raises(TypeError):
+        latex2pydata.loads(data_str, lazy=True, stats=stats)
+
+
+def test_annotation_normalization():
+    validator_dict = latex2pydata.schema.validator_dict
+    assert validator_dict["int | float"] is validator_dict["float|int"]
+    assert validator_dict["list[ None|int ]"] is validator_dict["list[int|None]"]
+    data_str = '{"key": "1.5"}'
+    assert latex2pydata.loads(data_str, schema={"key": "int | float"}) == {"key": 1.5}
+    # Error messages keep the union order of the annotation as written
+    with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError, match='type "int\\|None"'):
+        latex2pydata.loads(data_str, schema={"key": "int|None"})
+
+
+def test_generated_validators():
+    validator_dict = latex2pydata.schema.validator_dict
+    validate = validator_dict["dict[str, list[int|None]]"]
+    assert validate({"a": [1, None, True], "b": []})
+    assert not validate({"a": [1, 1.5]})
+    assert not validate({1: [1]})
+    assert not validate([])
+    assert validator_dict["list[Any]"]([1, "a", [2]])
+    assert validator_dict["set[str|bytes]"]({"a", b"b"})
+    assert not validator_dict["list[list[float]]"]([[1.5], 2.5])
+    with pytest.raises(latex2pydata.err.Latex2PydataSchemaError):
+        validator_dict["list[integer]"]
+
+
+def test_load_sidecar(tmp_path):
+    path = tmp_path / "data.pydata"
+    path.write_text('# latex2pydata metadata: {"schema": {"key": "list[int]"}, "schema_missing": "verbatim"}\n[{"key": "[1, 2]", "text": "a"}]\n', encoding="utf8")
+    expected = [{"key": [1, 2], "text": "a"}]
+    sidecar_path = latex2pydata.write_sidecar(path)
+    assert sidecar_path == tmp_path / "data.pydata.bin"
+
+    stats = latex2pydata.LoadStats()
+    assert latex2pydata.load(path, sidecar=True, stats=stats) == expected
+    assert stats.sidecar_hits == 1 and stats.records == 0
+
+    # Different settings, or sidecar not enabled
+    assert latex2pydata.load(path, schema={"key": "verbatim"}, schema_missing="verbatim", sidecar=True, stats=stats) == [{"key": "[1, 2]", "text": "a"}]
+    assert latex2pydata.load(path, stats=stats) == expected
+    assert stats.sidecar_hits == 1
+
+    # Stale or invalid sidecar
+    path.write_text('[{"key": "[3]"}]', encoding="utf8")
+    assert latex2pydata.load(path, sidecar=True) == [{"key": "[3]"}]
+    latex2pydata.write_sidecar(path)
+    assert latex2pydata.load(path, sidecar=True) == [{"key": "[3]"}]
+    sidecar_path.write_bytes(sidecar_path.read_bytes()[:-3])
+    assert latex2pydata.load(path, sidecar=True) == [{"key": "[3]"}]
+    sidecar_path.write_bytes(b"invalid")
+    assert latex2pydata.load(path, sidecar=True) == [{"key": "[3]"}]
@@ -0,0 +1,127 @@
+import asyncio
+import concurrent.futures
+import pytest
+import latex2pydata
+
+
+def test_load_many(tmp_path):
+    paths = []
+    for n in range(5):
+        path = tmp_path / f'data{n}.pydata'
+        path.write_text(f'[{{"key": "{n}"}}]', encoding='utf8')
+        paths.append(path)
+    paths.insert(2, tmp_path / 'missing.pydata')
+    bad_path = tmp_path / 'bad.pydata'
+    bad_path.write_text('[{"key": "x"}]', encoding='utf8')
+    paths.append(bad_path)
+
+    for workers, chunksize in ((1, 1), (2, 1), (2, 3)):
+        results = list(latex2pydata.load_many(paths, schema={"key": "int"}, workers=workers, chunksize=chunksize))
+        assert [r.path for r in results] == paths
+        assert [r.data for r in results] == [[{"key": 0}], [{"key": 1}], None, [{"key": 2}], [{"key": 3}], [{"key": 4}], None]
+        assert isinstance(results[2].error, FileNotFoundError)
+        assert isinstance(results[-1].error, latex2pydata.err.Latex2PydataInvalidDataError)
+
+    results = list(latex2pydata.load_many(paths, schema={"key": "int"}, workers=2, ordered=False))
+    assert sorted(str(r.path) for r in results) == sorted(str(p) for p in paths)
+
+    with pytest.raises(latex2pydata.err.Latex2PydataSchemaError):
+        list(latex2pydata.load_many(paths, schema={"key": "list[int"}))
+
+
+def test_load_many_interleaved(tmp_path):
+    paths = []
+    for n in range(3):
+        path = tmp_path / f'data{n}.pydata'
+        path.write_text(f'[{{"key": "{n}"}}]', encoding='utf8')
+        paths.append(path)
+
+    # Serial generators that are alive at the same time keep their own
+    # settings
+    loaded = latex2pydata.load_many(paths, schema={"key": "int"}, workers=1)
+    raw = latex2pydata.load_many(paths, workers=1)
+    validated = latex2pydata.validate_many(paths, schema={"key": "list[int]"}, max_errors=3, workers=1)
+    for n, (load_result, raw_result, validate_result) in enumerate(zip(loaded, raw, validated)):
+        assert load_result.error is None and load_result.data == [{"key": n}]
+        assert raw_result.error is None and raw_result.data == [{"key": str(n)}]
+        assert len(validate_result.errors) == 1
+        assert isinstance(validate_result.errors[0], latex2pydata.err.Latex2PydataInvalidDataError)
+
+
+def test_aload_many(tmp_path):
+    paths = []
+    for n in range(5):
+        path = tmp_path / f'data{n}.pydata'
+        path.write_text(f'[{{"key": "{n}"}}]', encoding='utf8')
+        paths.append(path)
+    paths.append(tmp_path / 'missing.pydata')
+
+    async def main():
+        assert await latex2pydata.aload(paths[0], schema={"key": "int"}) == [{"key": 0}]
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            results = [r async for r in latex2pydata.aload_many(paths, schema={"key": "int"}, executor=executor, limit=1)]
+            assert [r.data for r in results] == [[{"key": n}] for n in range(5)] + [None]
+            assert isinstance(results[-1].error, FileNotFoundError)
+            results = [r async for r in latex2pydata.aload_many(paths, executor=executor, ordered=False)]
+            assert sorted(str(r.path) for r in results) == sorted(str(p) for p in paths)
+            results = latex2pydata.aload_many(paths, executor=executor, limit=1)
+            async for result in results:
+                break
+            await results.aclose()
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            assert await latex2pydata.aload(paths[1], executor=executor) == [{"key": "1"}]
+        with pytest.raises(ValueError):
+            [r async for r in latex2pydata.aload_many(paths, limit=0)]
+
+    asyncio.run(main())
+
+
+def is_even(raw_data_dict):
+    return int(raw_data_dict["n"]) % 2 == 0
+
+
+@pytest.mark.parametrize("gil_disabled", [False, True])
+def test_loads_workers(monkeypatch, gil_disabled):
+    monkeypatch.setattr(latex2pydata.loading, "_gil_disabled", lambda: gil_disabled)
+    data_str = ('# latex2pydata metadata: {"schema": {"n": "int", "v.w": "list[int]"}}\n[\n' +
+                ''.join(f'{{"n": "{n}", "v.w": "[{n}, {n}]"}}, # {n}\n' for n in range(1000)) + ']\n')
+    expected = latex2pydata.loads(data_str)
+    assert len(expected) == 1000
+    for data in (data_str, data_str.encode("utf8")):
+        assert latex2pydata.loads(data, workers=3) == expected
+    assert latex2pydata.loads(data_str, workers=2, where=is_even, keys=["v"]) == [
+        {"v": d["v"]} for d in expected if d["n"] % 2 == 0
+    ]
+    assert latex2pydata.loads(data_str, workers=2, parser="literal_eval") == expected
+
+    # A pool may be reused.  Predicates that can't be sent to worker
+    # processes are rejected before any work is done.
+    with concurrent.futures.ProcessPoolExecutor(2) as executor:
+        for _ in range(2):
+            assert latex2pydata.loads(data_str, workers=2, executor=executor) == expected
+        with pytest.raises(ValueError, match="picklable"):
+            latex2pydata.loads(data_str, workers=2, executor=executor, where=lambda d: True)
+    if gil_disabled:
+        assert latex2pydata.loads(data_str, workers=2, where=lambda d: True) == expected
+    else:
+        with pytest.raises(ValueError, match="picklable"):
+            latex2pydata.loads(data_str, workers=2, where=lambda d: True)
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        assert latex2pydata.loads(data_str, workers=2, executor=executor, where=lambda d: True) == expected
+        with pytest.raises(TypeError):
+            latex2pydata.loads(data_str, executor=executor)
+
+    # Errors are the same as for serial loading:  the first invalid dict, or
+    # invalid structure after all dicts before it are loaded
+    for bad_str in (data_str.replace('"n": "100"', '"n": "1.5"').replace('"n": "900"', '"n": "2.5"'),
+                    data_str.replace('"n": "900"', '"n": "2.5"').replace('"n": "950", ', '"n": "950" ')):
+        with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError) as serial_error:
+            latex2pydata.loads(bad_str)
+        with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError) as parallel_error:
+            latex2pydata.loads(bad_str, workers=2)
+        assert str(parallel_error.value) == str(serial_error.value)
+
+    with pytest.raises(TypeError):
+        latex2pydata.loads(data_str, workers=2, lazy=True)
+    with pytest.raises(ValueError):
+        latex2pydata.loads(data_str, workers=0)
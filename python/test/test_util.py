@@ -0,0 +1,34 @@
+import threading
+import time
+from latex2pydata.util import LRUCache
+
+
+def test_lru_cache():
+    calls = []
+    def factory(key):
+        calls.append(key)
+        time.sleep(0.01)
+        return key * 2
+    cache = LRUCache(factory, maxsize=2, normalize=str.strip)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache[" a "])) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["aa"] * 8 and calls == ["a"]
+    assert cache.cache_info() == (7, 1, 2, 1) and cache.hit_rate == 7 / 8
+    cache["b"]
+    cache["a"]
+    cache["c"]
+    assert "a" in cache and "b" not in cache and len(cache) == 2
+
+    def failing_factory(key):
+        raise KeyError(key)
+    cache = LRUCache(failing_factory)
+    for _ in range(2):
+        try:
+            cache["x"]
+        except KeyError:
+            pass
+    assert cache.misses == 2 and len(cache) == 0
@@ -0,0 +1,67 @@
+import io
+import json
+import pytest
+import textwrap
+import latex2pydata
+
+
+def test_validate():
+    data_str = textwrap.dedent('''\
+        # latex2pydata metadata: {"schema": {"a": "int", "b.c": "list[int]"}}
+        [
+        {"a": "1", "b.c": "[1, 2]"},
+        {"a": "x", "b.c": "[1, 'y']"},
+        {"a": "3", "d": "4"},
+        ]
+        ''')
+    result = latex2pydata.validate(data_str)
+    assert not result.ok and result.records == 3 and not result.truncated
+    assert [(e.record, e.key) for e in result.errors] == [(1, "a"), (1, "b.c"), (2, "d")]
+    assert all(isinstance(e, latex2pydata.err.Latex2PydataInvalidDataError) for e in result.errors)
+    assert latex2pydata.validate(data_str, schema_missing="verbatim").errors[-1].key == "b.c"
+
+    result = latex2pydata.validate(data_str, max_errors=2)
+    assert result.truncated and result.records == 2 and len(result.errors) == 2
+
+    assert latex2pydata.validate(data_str.replace('"x"', '"2"').replace("'y'", "2"), schema_missing="verbatim").ok
+    result = latex2pydata.validate(data_str.replace('{"a": "3"', '{"a": 3'))
+    assert result.errors[-1].record is None and len(result.errors) == 3
+    result = latex2pydata.validate(data_str.replace('"int"', '"list[int"'))
+    assert isinstance(result.errors[0], latex2pydata.err.Latex2PydataSchemaError) and result.records == 0
+
+    assert latex2pydata.validate_file(io.BytesIO(data_str.encode("utf8"))).errors[0].key == "a"
+
+
+def test_validate_keypath_conflicts():
+    # Loading fails when a key path passes through a value that isn't a dict
+    data_str = '[{"a.b": "1"}, {"a": "1", "a.b": "2"}, {"a.b": "1", "a.b.c": "2"}, {"a.b": "1", "a": "2"}]'
+    result = latex2pydata.validate(data_str)
+    assert result.records == 4
+    assert [(e.record, e.key) for e in result.errors] == [(1, "a.b"), (2, "a.b.c")]
+    assert all(isinstance(e, latex2pydata.err.Latex2PydataInvalidDataError) for e in result.errors)
+    for record, raw_data_dict in enumerate(json.loads(data_str)):
+        if record in (1, 2):
+            for kwargs in ({}, {"stats": latex2pydata.LoadStats()}):
+                with pytest.raises(latex2pydata.err.Latex2PydataInvalidDataError, match="conflicts"):
+                    latex2pydata.loads(json.dumps(raw_data_dict), **kwargs)
+        else:
+            latex2pydata.loads(json.dumps(raw_data_dict))
+    # No conflict when the value is a dict
+    assert latex2pydata.validate('{"a": "{}", "a.b": "2"}', schema={"a": "dict[str, int]", "a.b": "int"}).ok
+
+
+def test_validate_many(tmp_path):
+    paths = []
+    for n, value in enumerate(["1", "x", "2"]):
+        path = tmp_path / f"data{n}.pydata"
+        path.write_text(f'[{{"key": "{value}"}}, {{"key": "{value}"}}]', encoding="utf8")
+        paths.append(path)
+    paths.append(tmp_path / "missing.pydata")
+    for workers in (1, 2):
+        results = list(latex2pydata.validate_many(paths, schema={"key": "int"}, workers=workers))
+        assert [r.path for r in results] == paths
+        assert [r.ok for r in results] == [True, False, True, False]
+        assert [(e.record, e.key) for e in results[1].errors] == [(0, "key"), (1, "key")]
+        assert isinstance(results[3].errors[0], FileNotFoundError)
+    results = list(latex2pydata.validate_many(paths[:2], schema={"key": "int"}, max_errors=1, workers=1))
+    assert results[1].truncated and len(results[1].errors) == 1